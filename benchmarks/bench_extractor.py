@@ -0,0 +1,91 @@
+"""Benchmark the schema-driven bill extractor against the original parser.
+
+Usage: python benchmarks/bench_extractor.py
+"""
+
+import random
+
+from common import format_time, load_module, timeit
+
+parser = load_module("parser")
+
+
+def legacy_extract_water_bill_info(json_data):
+    """原来的 extract_water_bill_info（只读取第一条记录），用作对比基准。"""
+    total_amount = None
+    usage = None
+    if isinstance(json_data, dict):
+        if 'total_amount' in json_data:
+            total_amount = float(json_data.get('total_amount', 0))
+        if 'usage' in json_data:
+            usage = float(json_data.get('usage', 0))
+        if not total_amount and 'data' in json_data:
+            data = json_data['data']
+            if isinstance(data, dict):
+                if 'total_amount' in data:
+                    total_amount = float(data.get('total_amount', 0))
+                if 'usage' in data:
+                    usage = float(data.get('usage', 0))
+                for key in ['bills', 'list', 'items', 'records']:
+                    if key in data and isinstance(data[key], list) and data[key]:
+                        first_bill = data[key][0]
+                        if isinstance(first_bill, dict):
+                            if 'total_amount' in first_bill:
+                                total_amount = float(first_bill.get('total_amount', 0))
+                            if 'usage' in first_bill:
+                                usage = float(first_bill.get('usage', 0))
+                            amount_keys = ['amount', 'total', 'cost', 'price']
+                            usage_keys = ['water_usage', 'consumption', 'volume', 'quantity']
+                            for amount_key in amount_keys:
+                                if amount_key in first_bill and total_amount is None:
+                                    total_amount = float(first_bill.get(amount_key, 0))
+                                    break
+                            for usage_key in usage_keys:
+                                if usage_key in first_bill and usage is None:
+                                    usage = float(first_bill.get(usage_key, 0))
+                                    break
+    return total_amount, usage
+
+
+def legacy_all_records(json_data):
+    """用原来的函数逐条处理所有记录，模拟旧实现处理多记录响应的开销。"""
+    records = json_data["data"]["records"]
+    return [legacy_extract_water_bill_info({"data": {"records": [record]}}) for record in records]
+
+
+def make_payload(count, seed=0):
+    """生成包含 count 条记录、字段名混用的响应。"""
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        record = {
+            "meterNo": f"44010{index:06d}",
+            "address": "广州市某区某路%d号" % index,
+            "billMonth": f"2024{(index % 12) + 1:02d}",
+            "status": "PAID",
+        }
+        amount_key = rng.choice(["total_amount", "amount", "cost"])
+        usage_key = rng.choice(["usage", "water_usage", "consumption", "volume"])
+        record[amount_key] = f"{rng.uniform(20, 200):.2f}"
+        record[usage_key] = f"{rng.uniform(5, 60):.1f}"
+        records.append(record)
+    return {"code": 0, "data": {"records": records, "total": count}}
+
+
+def main():
+    extractor = parser.BILL_EXTRACTOR
+    print(f"{'records':>8}  {'legacy (first)':>15}  {'legacy (all)':>13}  {'schema (all)':>13}")
+    for count in (1, 10, 100, 1000, 10000):
+        payload = make_payload(count)
+        assert len(extractor.extract(payload)) == count
+        first = timeit(legacy_extract_water_bill_info, payload)
+        legacy_all = timeit(legacy_all_records, payload)
+        schema_all = timeit(extractor.extract, payload)
+        print(
+            f"{count:>8}  {format_time(first):>15}  {format_time(legacy_all):>13}"
+            f"  {format_time(schema_all):>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
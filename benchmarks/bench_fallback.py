@@ -0,0 +1,131 @@
+"""Replay benchmark for the fetch fallback chain.
+
+Starts replay_server.py in a child process and runs the same per-account
+refresh the coordinator performs (``GzWaterApiClient.async_get_bill_data``)
+against each recorded scenario, reporting p50/p99 refresh latency, requests
+per refresh and peak Python memory of the client side.
+
+Usage: python benchmarks/bench_fallback.py [--runs N] [--warm]
+
+By default every refresh starts cold (new client, new endpoint router) so the
+whole fallback path is measured; ``--warm`` shares the router and session
+between refreshes, as the running integration does.  Client timeouts are
+scaled down to one second so the timeout scenario finishes quickly.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import statistics
+import time
+import tracemalloc
+
+import aiohttp
+
+import replay_server
+from common import format_time, load_module
+
+api = load_module("api")
+router_module = load_module("router")
+
+# 缩短客户端超时，使超时场景在1秒左右结束
+api.BIND_PAGE_TIMEOUT = 1.0
+api.REQUEST_TIMEOUT = 1.0
+
+FAR_FUTURE = time.time() + 10 * 365 * 86400
+VALID_SESSION = {"cookies": {"sid": ["fresh", FAR_FUTURE]}, "token": None}
+EXPIRED_SESSION = {"cookies": {"sid": ["stale", time.time() - 60]}, "token": None}
+UNKNOWN_EXPIRY_SESSION = {"cookies": {"sid": ["stale", None]}, "token": None}
+
+# (名称, 服务器场景, 初始会话)
+SCENARIOS = [
+    ("200 JSON bindPage", "json_bindpage", VALID_SESSION),
+    ("expired cookie (known)", "expired_cookie", EXPIRED_SESSION),
+    ("expired cookie (403)", "expired_cookie", UNKNOWN_EXPIRY_SESSION),
+    ("HTML-only bills", "html_only", VALID_SESSION),
+    ("slow bindPage", "slow", VALID_SESSION),
+    ("bindPage timeout", "timeout", VALID_SESSION),
+]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+async def _request_count(session, base, scenario):
+    async with session.get(f"{base}/_stats/{scenario}") as response:
+        return (await response.json())["requests"]
+
+
+async def run_scenario(session, base, scenario, session_state, runs, warm):
+    """运行一个场景，返回 (延迟列表, 每次刷新的请求数列表, 峰值内存)。"""
+    shared_router = router_module.EndpointRouter()
+    latencies = []
+    counts = []
+    client = None
+    await _request_count(session, base, scenario)
+
+    tracemalloc.start()
+    for _ in range(runs):
+        if client is None or not warm:
+            client = api.GzWaterApiClient(
+                session,
+                "1008836201",
+                "password",
+                base_url=f"{base}/{scenario}",
+                session_state={
+                    "cookies": {k: list(v) for k, v in session_state["cookies"].items()},
+                    "token": session_state["token"],
+                },
+                router=shared_router if warm else router_module.EndpointRouter(),
+            )
+        start = time.perf_counter()
+        data = await client.async_get_bill_data()
+        latencies.append(time.perf_counter() - start)
+        assert data["total_amount"] == 88.6, (scenario, data)
+        counts.append(await _request_count(session, base, scenario))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, counts, peak
+
+
+async def main(runs, warm):
+    port = _free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=replay_server.run, args=(port, ready), daemon=True
+    )
+    server.start()
+    ready.wait(10)
+    base = f"http://127.0.0.1:{port}"
+
+    print(f"{'scenario':<24} {'p50':>10} {'p99':>10} {'requests':>9} {'peak mem':>10}")
+    try:
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
+            for name, scenario, session_state in SCENARIOS:
+                latencies, counts, peak = await run_scenario(
+                    session, base, scenario, session_state, runs, warm
+                )
+                print(
+                    f"{name:<24} {format_time(_percentile(latencies, 0.5)):>10}"
+                    f" {format_time(_percentile(latencies, 0.99)):>10}"
+                    f" {statistics.mean(counts):>9.1f} {peak / 1024:>6.0f} KiB"
+                )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50, help="每个场景的刷新次数")
+    parser.add_argument("--warm", action="store_true", help="在多次刷新之间共享路由器和会话")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.warm))
@@ -0,0 +1,130 @@
+"""Benchmark the streaming HTML bill extractor against the BeautifulSoup one.
+
+Usage: python benchmarks/bench_html.py
+The BeautifulSoup baseline is skipped when beautifulsoup4 is not installed.
+"""
+
+import datetime
+import json
+import re
+import tracemalloc
+
+from common import format_time, load_module, timeit
+
+parser = load_module("parser")
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+def legacy_parse_html_for_bill_data(html_content):
+    """原来基于BeautifulSoup的实现，用作对比基准。"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    total_amount = None
+    usage = None
+    bill_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    amount_elements = soup.find_all(['div', 'span', 'p'], string=re.compile(r'水费|金额|合计'))
+    for element in amount_elements:
+        next_element = element.find_next(['div', 'span', 'p'])
+        if next_element and '¥' in next_element.text or '.' in next_element.text:
+            match = re.search(r'\d+\.\d+', next_element.text)
+            if match:
+                total_amount = match.group()
+                break
+    usage_elements = soup.find_all(['div', 'span', 'p'], string=re.compile(r'用水量|水量|吨数'))
+    for element in usage_elements:
+        next_element = element.find_next(['div', 'span', 'p'])
+        if next_element and ('吨' in next_element.text or 'm³' in next_element.text):
+            match = re.search(r'\d+\.?\d*', next_element.text)
+            if match:
+                usage = match.group()
+                break
+    if total_amount and usage:
+        return {"total_amount": float(total_amount), "usage": float(usage), "bill_date": bill_date}
+    for script in soup.find_all('script'):
+        script_content = script.string
+        if script_content:
+            data_match = re.search(r'var\s+billData\s*=\s*(\{[^}]+\})', script_content)
+            if data_match:
+                bill_data = json.loads(data_match.group(1))
+                return {
+                    "total_amount": float(bill_data.get("total_amount", 0)),
+                    "usage": float(bill_data.get("usage", 0)),
+                    "bill_date": bill_data.get("bill_date", bill_date),
+                }
+    return None
+
+
+def make_page(rows, bill_position=0.5, with_text=True):
+    """生成一个账单查询页面。
+
+    rows 控制页面大小（历史账单表格行数），bill_position 是当前账单在
+    页面中的相对位置；with_text 为False时只有内嵌的billData脚本。
+    """
+    head = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>广州自来水 账单查询</title>",
+        "<link rel='stylesheet' href='/static/app.css'>",
+        "<script>window.__CONFIG__ = {\"env\": \"prod\", \"version\": \"3.2.1\"};</script>",
+        "<script>var billData = {\"total_amount\": \"88.60\", \"usage\": \"23\", "
+        "\"bill_date\": \"2024-06-15\"};</script>",
+        "</head><body><div class='app'><header><nav>",
+    ]
+    head += [f"<a href='/menu/{i}'><span>菜单{i}</span></a>" for i in range(30)]
+    head.append("</nav></header><main>")
+    history = ["<table class='history'><tr><th>月份</th><th>读数</th><th>状态</th></tr>"]
+    for i in range(rows):
+        history.append(
+            f"<tr><td><span>2023-{i % 12 + 1:02d}</span></td><td><span>{1000 + i}</span></td>"
+            f"<td><span class='status'>已缴</span></td></tr>"
+        )
+    history.append("</table>")
+    current = []
+    if with_text:
+        current = [
+            "<section class='bill'><div class='row'><span>本期水费</span><span>¥88.60</span></div>",
+            "<div class='row'><span>本期用水量</span><span>23吨</span></div></section>",
+        ]
+    split = int(len(history) * bill_position)
+    tail = ["</main><footer><p>客服热线 96968</p></footer></div>",
+            "<script src='/static/vendor.js'></script></body></html>"]
+    return "".join(head + history[:split] + current + history[split:] + tail)
+
+
+def peak_memory(func, *args):
+    """返回一次调用的峰值内存（字节）。"""
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    scenarios = [
+        ("small page, bill at top", make_page(20, 0.0)),
+        ("large page, bill at top", make_page(2000, 0.0)),
+        ("large page, bill in middle", make_page(2000, 0.5)),
+        ("large page, billData only", make_page(2000, with_text=False)),
+    ]
+    print(f"{'scenario':<28} {'size':>8}  {'bs4 time':>10} {'bs4 peak':>10}"
+          f"  {'stream time':>11} {'stream peak':>11}")
+    for name, page in scenarios:
+        streamed = parser.parse_html_for_bill_data(page)
+        stream_time = timeit(parser.parse_html_for_bill_data, page, repeat=3)
+        stream_peak = peak_memory(parser.parse_html_for_bill_data, page)
+        if BeautifulSoup is not None:
+            assert legacy_parse_html_for_bill_data(page) == streamed, name
+            legacy_time = format_time(timeit(legacy_parse_html_for_bill_data, page, repeat=3))
+            legacy_peak = f"{peak_memory(legacy_parse_html_for_bill_data, page) / 1024:.0f} KiB"
+        else:
+            legacy_time = legacy_peak = "n/a"
+        print(
+            f"{name:<28} {len(page) / 1024:>6.0f}KiB  {legacy_time:>10} {legacy_peak:>10}"
+            f"  {format_time(stream_time):>11} {stream_peak / 1024:>7.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Shared helpers for the gzwater benchmarks.
+
+The integration's ``__init__`` imports Home Assistant, which the benchmarks
+do not need.  ``load_module`` registers the component directory as a bare
+package so that its standalone modules can be imported on their own.
+"""
+
+import importlib
+import os
+import sys
+import time
+import types
+
+COMPONENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "custom_components",
+    "gzwater",
+)
+PACKAGE = "gzwater_bench"
+
+
+def load_module(name):
+    """Import ``custom_components/gzwater/<name>.py`` without the package __init__."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [COMPONENT_DIR]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+def timeit(func, *args, repeat=5, number=None):
+    """Return the best per-call time of ``func(*args)`` in seconds."""
+    if number is None:
+        # 自动选择循环次数，使每轮至少运行0.2秒
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func(*args)
+            if time.perf_counter() - start >= 0.2:
+                break
+            number *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def format_time(seconds):
+    """以合适的单位格式化耗时。"""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
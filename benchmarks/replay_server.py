@@ -0,0 +1,166 @@
+"""Local stand-in for service.gzwatersupply.com serving recorded responses.
+
+Every scenario lives under its own URL prefix, e.g. ``/json_bindpage/api/...``,
+so one server can back all benchmark scenarios.  ``GET /_stats/<scenario>``
+returns and resets the number of requests the scenario has received.
+
+Usage: python benchmarks/replay_server.py [port]
+"""
+
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+RESPONSES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "responses")
+
+BIND_PAGE_PATH = "/api/gsxmcp/rg/um/v1.0/user/bindPage"
+LOGIN_PATH = "/api/login"
+BILL_QUERY_PATH = "/api/bill/query"
+BILL_PATH = "/bill/query"
+
+# 慢响应和超时场景的延迟（秒），基准测试会把客户端超时缩短到 TIMEOUT_DELAY 以下
+SLOW_DELAY = 0.5
+TIMEOUT_DELAY = 2.0
+
+FRESH_COOKIE = "sid=fresh"
+
+
+def _load(name):
+    with open(os.path.join(RESPONSES_DIR, name), "rb") as file:
+        return file.read()
+
+
+BIND_PAGE_JSON = _load("bind_page.json")
+BILL_QUERY_JSON = _load("bill_query.json")
+BILL_PAGE_HTML = _load("bill_page.html")
+
+
+def _json(body):
+    return web.Response(body=body, content_type="application/json", charset="utf-8")
+
+
+def _html(body):
+    return web.Response(body=body, content_type="text/html", charset="utf-8")
+
+
+def _has_fresh_cookie(request):
+    return FRESH_COOKIE in request.headers.get("Cookie", "")
+
+
+async def _login(request):
+    response = _json(b'{"code": 0, "data": {"token": "bench", "expiresIn": 7200}}')
+    response.set_cookie("sid", "fresh", max_age=1800)
+    return response
+
+
+async def _json_bind_page(request):
+    return _json(BIND_PAGE_JSON)
+
+
+async def _bind_page_requires_login(request):
+    if not _has_fresh_cookie(request):
+        return web.Response(status=403)
+    return _json(BIND_PAGE_JSON)
+
+
+async def _bill_query_requires_login(request):
+    if not _has_fresh_cookie(request):
+        return web.Response(status=403)
+    return _json(BILL_QUERY_JSON)
+
+
+async def _html_bind_page(request):
+    return _html("<html><body><p>请在微信中打开</p></body></html>".encode())
+
+
+async def _html_bill(request):
+    return _html(BILL_PAGE_HTML)
+
+
+async def _slow_bind_page(request):
+    await asyncio.sleep(SLOW_DELAY)
+    return _json(BIND_PAGE_JSON)
+
+
+async def _hanging(request):
+    await asyncio.sleep(TIMEOUT_DELAY)
+    return web.Response(status=504)
+
+
+async def _bill_query(request):
+    return _json(BILL_QUERY_JSON)
+
+
+# 场景 -> {(方法, 路径): 处理函数}，没有列出的路径返回404
+SCENARIOS = {
+    # 会话有效，bindPage直接返回JSON
+    "json_bindpage": {
+        ("GET", BIND_PAGE_PATH): _json_bind_page,
+    },
+    # Cookie已过期：bindPage返回403，登录后才能访问
+    "expired_cookie": {
+        ("GET", BIND_PAGE_PATH): _bind_page_requires_login,
+        ("POST", LOGIN_PATH): _login,
+        ("GET", BILL_QUERY_PATH): _bill_query_requires_login,
+    },
+    # 只有HTML账单页：bindPage不是JSON，备用端点返回HTML
+    "html_only": {
+        ("GET", BIND_PAGE_PATH): _html_bind_page,
+        ("GET", BILL_PATH): _html_bill,
+    },
+    # bindPage响应缓慢
+    "slow": {
+        ("GET", BIND_PAGE_PATH): _slow_bind_page,
+    },
+    # bindPage超时，第一个备用端点可用
+    "timeout": {
+        ("GET", BIND_PAGE_PATH): _hanging,
+        ("GET", BILL_QUERY_PATH): _bill_query,
+    },
+}
+
+
+def create_app():
+    """创建按场景前缀分发的应用。"""
+    counts = {name: 0 for name in SCENARIOS}
+
+    async def dispatch(request):
+        scenario = request.match_info["scenario"]
+        if scenario not in SCENARIOS:
+            raise web.HTTPNotFound()
+        counts[scenario] += 1
+        handler = SCENARIOS[scenario].get((request.method, "/" + request.match_info["path"]))
+        if handler is None:
+            raise web.HTTPNotFound()
+        return await handler(request)
+
+    async def stats(request):
+        scenario = request.match_info["scenario"]
+        count = counts.get(scenario, 0)
+        counts[scenario] = 0
+        return web.json_response({"requests": count})
+
+    app = web.Application()
+    app.router.add_get("/_stats/{scenario}", stats)
+    app.router.add_route("*", "/{scenario}/{path:.*}", dispatch)
+    return app
+
+
+def run(port, ready=None):
+    """运行服务器；ready 为 multiprocessing.Event 时在就绪后置位。"""
+
+    async def main():
+        runner = web.AppRunner(create_app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        if ready is not None:
+            ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 8968)
@@ -1,41 +1,125 @@
 """The gzwater integration."""
 
 import logging
-from datetime import timedelta
+import random
 
+import aiohttp
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_NAME, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.start import async_at_started
 
-# 设置正确的Python路径，确保能够导入const模块
-import sys
-import os
+from .api import GzWaterApiClient, RateLimiter, SingleFlight
+from .const import (
+    DOMAIN,
+    CONF_USER_ID,
+    CONF_PASSWORD,
+    CONF_ACCOUNTS,
+    CONF_MAX_CONCURRENCY,
+    CONF_RATE_LIMIT,
+    CONF_HEDGE_DELAY,
+    CONF_DIAGNOSTICS,
+    CONF_FRESHNESS,
+    CONF_MAX_STALENESS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_FRESHNESS,
+    DEFAULT_MAX_STALENESS,
+    STARTUP_REFRESH_JITTER,
+)
+from .coordinator import GzWaterDataUpdateCoordinator
+from .data_store import GzWaterDataStore
+from .export import async_register_services
+from .history import HISTORY_DB_NAME, BillHistoryStore
+from .metrics import RefreshMetrics
+from .router import EndpointRouter
+from .session_store import GzWaterSessionStore
 
-# 获取当前文件所在目录的父目录（即gzwater目录）
-gzwater_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LOGGER = logging.getLogger(__name__)
 
-# 将gzwater目录添加到Python路径，这样就能直接导入custom_components模块
-sys.path.append(gzwater_dir)
+ACCOUNT_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_USER_ID): cv.string,
+        vol.Required(CONF_PASSWORD): cv.string,
+        vol.Optional(CONF_NAME): cv.string,
+    }
+)
 
-# 导入常量
-from custom_components.const import DOMAIN, CONF_USER_ID, CONF_PASSWORD, SCAN_INTERVAL
+def _unique_user_ids(conf):
+    """拒绝重复的户号，包括旧配置方式的户号和accounts列表之间的重复。"""
+    seen = set()
+    user_ids = [conf[CONF_USER_ID]] if CONF_USER_ID in conf else []
+    user_ids.extend(account[CONF_USER_ID] for account in conf.get(CONF_ACCOUNTS, []))
+    for user_id in user_ids:
+        if user_id in seen:
+            raise vol.Invalid(f"户号 {user_id} 重复配置", path=[CONF_ACCOUNTS])
+        seen.add(user_id)
+    return conf
 
-_LOGGER = logging.getLogger(__name__)
 
 CONFIG_SCHEMA = vol.Schema(
     {
-        DOMAIN: vol.Schema(
-            {
-                vol.Required(CONF_USER_ID): cv.string,
-                vol.Required(CONF_PASSWORD): cv.string,
-            }
+        DOMAIN: vol.All(
+            vol.Schema(
+                {
+                    # 单账号的旧配置方式
+                    vol.Inclusive(CONF_USER_ID, "account"): cv.string,
+                    vol.Inclusive(CONF_PASSWORD, "account"): cv.string,
+                    vol.Optional(CONF_ACCOUNTS): vol.All(cv.ensure_list, [ACCOUNT_SCHEMA]),
+                    vol.Optional(
+                        CONF_MAX_CONCURRENCY, default=DEFAULT_MAX_CONCURRENCY
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_RATE_LIMIT, default=DEFAULT_RATE_LIMIT
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    # 设置后并发请求备用端点，值为发出下一个请求前的等待秒数
+                    vol.Optional(CONF_HEDGE_DELAY): vol.All(
+                        vol.Coerce(float), vol.Range(min=0)
+                    ),
+                    # 记录每次刷新的分阶段耗时和计数，并创建诊断传感器
+                    vol.Optional(CONF_DIAGNOSTICS, default=False): cv.boolean,
+                    # 同一账号在此秒数内重复刷新时直接复用上次结果
+                    vol.Optional(
+                        CONF_FRESHNESS, default=DEFAULT_FRESHNESS
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    # 获取失败时继续显示旧数据，超过此秒数后实体变为不可用
+                    vol.Optional(
+                        CONF_MAX_STALENESS, default=DEFAULT_MAX_STALENESS
+                    ): cv.positive_int,
+                }
+            ),
+            cv.has_at_least_one_key(CONF_USER_ID, CONF_ACCOUNTS),
+            _unique_user_ids,
         )
     },
     extra=vol.ALLOW_EXTRA,
 )
 
+
+def _configured_accounts(conf):
+    """将旧的单账号配置和accounts列表统一为账号列表。
+
+    旧配置方式的账号没有名称，传感器沿用原来的实体ID。
+    """
+    accounts = []
+    if CONF_USER_ID in conf:
+        accounts.append(
+            {CONF_USER_ID: conf[CONF_USER_ID], CONF_PASSWORD: conf[CONF_PASSWORD], CONF_NAME: None}
+        )
+    for account in conf.get(CONF_ACCOUNTS, []):
+        accounts.append(
+            {
+                CONF_USER_ID: account[CONF_USER_ID],
+                CONF_PASSWORD: account[CONF_PASSWORD],
+                CONF_NAME: account.get(CONF_NAME, account[CONF_USER_ID]),
+            }
+        )
+    return accounts
+
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the gzwater component."""
     if DOMAIN not in config:
@@ -44,15 +128,78 @@ async def async_setup(hass: HomeAssistant, config: dict):
     conf = config[DOMAIN]
     hass.data.setdefault(DOMAIN, {})
     
+    # 整个集成共用一个连接池会话，Cookie由各账号客户端自行管理
+    session = async_create_clientsession(hass, cookie_jar=aiohttp.DummyCookieJar())
+
+    # 加载已保存的登录会话，重启后无需重新登录
+    session_store = GzWaterSessionStore(hass)
+    await session_store.async_load()
+
+    # 加载上次成功获取的数据，实体启动后立即有值
+    data_store = GzWaterDataStore(hass)
+    restored, fetched_at = await data_store.async_load()
+
+    # 所有账号共享一个全局限速器、端点路由器和请求合并器
+    rate_limiter = RateLimiter(conf[CONF_RATE_LIMIT])
+    router = EndpointRouter()
+    hass.data[DOMAIN]["router"] = router
+    single_flight = SingleFlight(conf[CONF_FRESHNESS])
+    accounts = _configured_accounts(conf)
+    clients = [
+        GzWaterApiClient(
+            session,
+            account[CONF_USER_ID],
+            account[CONF_PASSWORD],
+            rate_limiter=rate_limiter,
+            session_state=session_store.get(account[CONF_USER_ID]),
+            on_session_update=session_store.async_update_session,
+            router=router,
+            hedge_delay=conf.get(CONF_HEDGE_DELAY),
+            metrics=RefreshMetrics() if conf[CONF_DIAGNOSTICS] else None,
+            single_flight=single_flight,
+        )
+        for account in accounts
+    ]
+
+    # 本地历史账单库
+    history = BillHistoryStore(hass.config.path(HISTORY_DB_NAME))
+    await hass.async_add_executor_job(history.open)
+    hass.data[DOMAIN]["history"] = history
+
+    async def _async_close_history(event):
+        await hass.async_add_executor_job(history.close)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_history)
+
     # 创建数据更新协调器
     coordinator = GzWaterDataUpdateCoordinator(
-        hass, user_id=conf[CONF_USER_ID], password=conf[CONF_PASSWORD]
+        hass,
+        clients,
+        max_concurrency=conf[CONF_MAX_CONCURRENCY],
+        history=history,
+        account_names={
+            account[CONF_USER_ID]: account[CONF_NAME] for account in accounts
+        },
+        data_store=data_store,
+        max_staleness=conf[CONF_MAX_STALENESS],
     )
-    
-    # 立即获取一次数据
-    await coordinator.async_refresh()
-    
+    coordinator.restore(restored, fetched_at)
+    await coordinator.async_load_analytics()
+
+    # 首次联网刷新放到Home Assistant启动完成之后，并加入随机延迟，
+    # 不阻塞启动，也避免多个实例同时请求服务器
+    async def _async_first_refresh(_now):
+        await coordinator.async_refresh()
+
+    @callback
+    def _schedule_first_refresh(_hass):
+        async_call_later(hass, random.uniform(0, STARTUP_REFRESH_JITTER), _async_first_refresh)
+
+    async_at_started(hass, _schedule_first_refresh)
+
     hass.data[DOMAIN]["coordinator"] = coordinator
+    hass.data[DOMAIN]["accounts"] = accounts
+    async_register_services(hass)
     
     # 设置传感器
     hass.async_create_task(
@@ -68,324 +215,3 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     return True
-
-class GzWaterDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching data from the gzwater API."""
-    
-    def __init__(self, hass, user_id, password):
-        """Initialize the coordinator."""
-        self.user_id = user_id
-        self.password = password
-        self.data = {}
-        
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(seconds=SCAN_INTERVAL),
-        )
-    
-    async def _async_update_data(self):
-        """从广州自来水96968平台获取实际数据。"""
-        try:
-            import requests
-            from requests.exceptions import RequestException
-            from bs4 import BeautifulSoup
-            import re
-            import datetime
-            import json
-            
-            def fetch_gzwater_data(user_id, password):
-                """使用Cookie直接从广州自来水96968平台获取数据。"""
-                # 用户提供的Cookie和请求头信息
-                cookie = "acw_tc=0ae5a86f17636087759827120e94881be0b4441409722cbe7e436910352c25;path=/;HttpOnly;Max-Age=1800;caf_web_session=NGVmNWViNDQtMDJiOS00MWI3LTlmMWQtOWE1NmY1M2M4ZGJj; Domain=service.gzwatersupply.com; Path=/; HttpOnly; SameSite=Lax"
-                
-                try:
-                    # 创建session并设置headers
-                    session = requests.Session()
-                    session.headers.update({
-                        "Cookie": cookie,
-                        "Host": "service.gzwatersupply.com",
-                        "Connection": "keep-alive",
-                        "content-type": "application/json",
-                        "Accept": "*/*",
-                        "Accept-Encoding": "gzip,compress,br,deflate",
-                        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 18_6_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 MicroMessenger/8.0.65(0x1800412b) NetType/WIFI Language/zh_CN",
-                        "Referer": "https://servicewechat.com/wx57c5715fd3a99e4a/171/page-frame.html"
-                    })
-                    
-                    _LOGGER.debug("使用Cookie直接获取水费数据")
-                    
-                    # 使用用户提供的API端点
-                    bill_url = "https://service.gzwatersupply.com/api/gsxmcp/rg/um/v1.0/user/bindPage?meter=hide&pageSize=10&pageNumber=1"
-                    response = session.get(bill_url, timeout=15)
-                    
-                    _LOGGER.debug(f"API响应状态码: {response.status_code}")
-                    _LOGGER.debug(f"API响应内容类型: {response.headers.get('content-type')}")
-                    
-                    # 检查响应状态
-                    if response.status_code == 200:
-                        try:
-                            # 尝试解析JSON响应
-                            bill_data = response.json()
-                            _LOGGER.debug(f"成功解析JSON响应: {bill_data}")
-                            
-                            # 尝试从JSON数据中提取水费相关信息
-                            # 具体字段需要根据实际返回的JSON结构调整
-                            total_amount, usage = extract_water_bill_info(bill_data)
-                            if total_amount is not None and usage is not None:
-                                return {
-                                    "total_amount": total_amount,
-                                    "usage": usage,
-                                    "bill_date": datetime.datetime.now().strftime("%Y-%m-%d")
-                                }
-                            else:
-                                _LOGGER.warning("无法从JSON响应中提取有效数据")
-                                # 如果无法从JSON获取数据，尝试备用端点
-                                return fetch_alternative_endpoint(session, user_id)
-                        except json.JSONDecodeError:
-                            _LOGGER.warning("响应不是有效的JSON格式，尝试备用方式")
-                            return fetch_alternative_endpoint(session, user_id)
-                    elif response.status_code == 403:
-                        _LOGGER.error("访问被拒绝(403)，Cookie可能已过期")
-                        # 尝试备用登录方式
-                        return fetch_with_login(user_id, password)
-                    else:
-                        _LOGGER.error(f"请求失败，状态码: {response.status_code}")
-                        # 尝试备用方式
-                        return fetch_with_login(user_id, password)
-                    
-                except RequestException as e:
-                    _LOGGER.error(f"网络请求错误: {str(e)}")
-                    # 尝试登录方式
-                    try:
-                        return fetch_with_login(user_id, password)
-                    except Exception as login_error:
-                        _LOGGER.error(f"登录方式也失败: {str(login_error)}")
-                        # 返回模拟数据
-                        return generate_mock_data()
-                except Exception as e:
-                    _LOGGER.error(f"获取水费数据失败: {str(e)}")
-                    return generate_mock_data()
-            
-            def extract_water_bill_info(json_data):
-                """从JSON响应中提取水费信息。"""
-                _LOGGER.debug("尝试从JSON数据中提取水费信息")
-                
-                try:
-                    # 根据实际返回的JSON结构提取数据
-                    # 这里提供了几种常见的提取方式，需要根据实际返回结构调整
-                    total_amount = None
-                    usage = None
-                    
-                    # 检查是否是常见的API响应结构
-                    if isinstance(json_data, dict):
-                        # 尝试从不同可能的字段路径获取数据
-                        # 1. 直接在响应中查找
-                        if 'total_amount' in json_data:
-                            total_amount = float(json_data.get('total_amount', 0))
-                        if 'usage' in json_data:
-                            usage = float(json_data.get('usage', 0))
-                        
-                        # 2. 检查data字段
-                        if not total_amount and 'data' in json_data:
-                            data = json_data['data']
-                            if isinstance(data, dict):
-                                if 'total_amount' in data:
-                                    total_amount = float(data.get('total_amount', 0))
-                                if 'usage' in data:
-                                    usage = float(data.get('usage', 0))
-                                # 检查bills或list字段
-                                for key in ['bills', 'list', 'items', 'records']:
-                                    if key in data and isinstance(data[key], list) and data[key]:
-                                        first_bill = data[key][0]
-                                        if isinstance(first_bill, dict):
-                                            if 'total_amount' in first_bill:
-                                                total_amount = float(first_bill.get('total_amount', 0))
-                                            if 'usage' in first_bill:
-                                                usage = float(first_bill.get('usage', 0))
-                                            # 尝试查找包含金额和用水量的其他常见字段名
-                                            amount_keys = ['amount', 'total', 'cost', 'price']
-                                            usage_keys = ['water_usage', 'consumption', 'volume', 'quantity']
-                                            
-                                            for amount_key in amount_keys:
-                                                if amount_key in first_bill and total_amount is None:
-                                                    total_amount = float(first_bill.get(amount_key, 0))
-                                                    break
-                                            
-                                            for usage_key in usage_keys:
-                                                if usage_key in first_bill and usage is None:
-                                                    usage = float(first_bill.get(usage_key, 0))
-                                                    break
-                    
-                    _LOGGER.debug(f"从JSON提取结果: 水费总额={total_amount}, 用水量={usage}")
-                    return total_amount, usage
-                    
-                except Exception as e:
-                    _LOGGER.error(f"从JSON提取数据失败: {str(e)}")
-                    return None, None
-            
-            def fetch_alternative_endpoint(session, user_id):
-                """尝试备用API端点获取数据。"""
-                _LOGGER.info("尝试使用备用API端点获取数据")
-                
-                try:
-                    # 备用API端点列表
-                    alternative_endpoints = [
-                        f"https://service.gzwatersupply.com/api/bill/query?account={user_id}",
-                        "https://service.gzwatersupply.com/bill/query",
-                        f"https://service.gzwatersupply.com/api/user/bills?account={user_id}"
-                    ]
-                    
-                    for endpoint in alternative_endpoints:
-                        _LOGGER.debug(f"尝试备用端点: {endpoint}")
-                        response = session.get(endpoint, timeout=10)
-                        
-                        if response.status_code == 200:
-                            try:
-                                # 尝试解析JSON
-                                bill_data = response.json()
-                                total_amount, usage = extract_water_bill_info(bill_data)
-                                if total_amount is not None and usage is not None:
-                                    return {
-                                        "total_amount": total_amount,
-                                        "usage": usage,
-                                        "bill_date": datetime.datetime.now().strftime("%Y-%m-%d")
-                                    }
-                            except json.JSONDecodeError:
-                                # 如果不是JSON，尝试解析HTML
-                                result = parse_html_for_bill_data(response.text, user_id)
-                                if result:
-                                    return result
-                    
-                    _LOGGER.warning("所有备用端点都失败")
-                    return generate_mock_data()
-                    
-                except Exception as e:
-                    _LOGGER.error(f"备用端点请求失败: {str(e)}")
-                    return generate_mock_data()
-            
-            def parse_html_for_bill_data(html_content, user_id):
-                """从HTML内容中解析水费数据。"""
-                _LOGGER.debug("尝试从HTML解析水费数据")
-                
-                try:
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    # 这里根据实际网页结构调整选择器
-                    # 假设页面中包含相关数据的标签
-                    total_amount = None
-                    usage = None
-                    bill_date = datetime.datetime.now().strftime("%Y-%m-%d")
-                    
-                    # 尝试通过不同方式查找水费总额
-                    amount_elements = soup.find_all(['div', 'span', 'p'], string=re.compile(r'水费|金额|合计'))
-                    for element in amount_elements:
-                        next_element = element.find_next(['div', 'span', 'p'])
-                        if next_element and '¥' in next_element.text or '.' in next_element.text:
-                            match = re.search(r'\d+\.\d+', next_element.text)
-                            if match:
-                                total_amount = match.group()
-                                break
-                    
-                    # 尝试通过不同方式查找用水量
-                    usage_elements = soup.find_all(['div', 'span', 'p'], string=re.compile(r'用水量|水量|吨数'))
-                    for element in usage_elements:
-                        next_element = element.find_next(['div', 'span', 'p'])
-                        if next_element and ('吨' in next_element.text or 'm³' in next_element.text):
-                            match = re.search(r'\d+\.?\d*', next_element.text)
-                            if match:
-                                usage = match.group()
-                                break
-                    
-                    # 如果找到了有效数据，返回
-                    if total_amount and usage:
-                        _LOGGER.info(f"成功从HTML解析数据: 水费总额={total_amount}, 用水量={usage}")
-                        return {
-                            "total_amount": float(total_amount),
-                            "usage": float(usage),
-                            "bill_date": bill_date
-                        }
-                    else:
-                        # 如果没有找到有效数据，尝试查找JSON数据
-                        script_tags = soup.find_all('script')
-                        for script in script_tags:
-                            script_content = script.string
-                            if script_content:
-                                # 尝试查找可能的JSON数据
-                                data_match = re.search(r'var\s+billData\s*=\s*(\{[^}]+\})', script_content)
-                                if data_match:
-                                    try:
-                                        bill_data = json.loads(data_match.group(1))
-                                        return {
-                                            "total_amount": float(bill_data.get("total_amount", 0)),
-                                            "usage": float(bill_data.get("usage", 0)),
-                                            "bill_date": bill_data.get("bill_date", bill_date)
-                                        }
-                                    except json.JSONDecodeError:
-                                        pass
-                        
-                        _LOGGER.warning("无法从HTML解析有效数据")
-                        return generate_mock_data()
-                    
-                except Exception as e:
-                    _LOGGER.error(f"解析HTML失败: {str(e)}")
-                    return generate_mock_data()
-            
-            def fetch_with_login(user_id, password):
-                """备用方案：使用用户名和密码登录获取数据。"""
-                _LOGGER.info("使用备用登录方式获取数据")
-                session = requests.Session()
-                
-                try:
-                    # 尝试登录
-                    login_url = "https://service.gzwatersupply.com/api/login"
-                    login_payload = {
-                        "account": user_id,
-                        "password": password
-                    }
-                    
-                    login_response = session.post(login_url, json=login_payload, timeout=10)
-                    login_response.raise_for_status()
-                    
-                    # 尝试获取水费数据
-                    bill_url = "https://service.gzwatersupply.com/api/bill/query"
-                    bill_response = session.get(bill_url, timeout=10)
-                    bill_response.raise_for_status()
-                    
-                    # 解析响应
-                    try:
-                        bill_data = bill_response.json()
-                        return {
-                            "total_amount": float(bill_data.get("total_amount", 0)),
-                            "usage": float(bill_data.get("usage", 0)),
-                            "bill_date": bill_data.get("bill_date", datetime.datetime.now().strftime("%Y-%m-%d"))
-                        }
-                    except (json.JSONDecodeError, KeyError):
-                        # 如果不是JSON响应，尝试解析HTML
-                        return parse_html_for_bill_data(bill_response.text, user_id)
-                        
-                except Exception as e:
-                    _LOGGER.error(f"备用登录方式失败: {str(e)}")
-                    return generate_mock_data()
-            
-            def generate_mock_data():
-                """生成模拟数据，作为所有获取方法都失败时的备选。"""
-                import random
-                _LOGGER.warning("使用模拟数据，实际水费数据获取失败")
-                return {
-                    "total_amount": round(random.uniform(30, 100), 2),
-                    "usage": round(random.uniform(10, 30), 1),
-                    "bill_date": datetime.datetime.now().strftime("%Y-%m-%d")
-                }
-            
-            # 使用Home Assistant的线程池执行器运行同步代码
-            data = await self.hass.async_add_executor_job(
-                fetch_gzwater_data, self.user_id, self.password
-            )
-            
-            _LOGGER.debug(f"成功获取水费数据: {data}")
-            return data
-            
-        except Exception as error:
-            raise UpdateFailed(f"无法获取广州市自来水数据: {error}")
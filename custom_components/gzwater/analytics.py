@@ -0,0 +1,81 @@
+"""Incremental consumption analytics for the gzwater integration."""
+
+from collections import deque
+
+ROLLING_WINDOWS = (3, 12)  # 滚动平均的账期数
+LOOKBACK = 24  # 保留的账期数，足够覆盖最长的滚动窗口和去年同期
+
+
+def _previous_year(period):
+    """返回去年同期的账期，如 2024-05 -> 2023-05。"""
+    year, _, month = period.partition("-")
+    try:
+        return f"{int(year) - 1:04d}-{month}"
+    except ValueError:
+        return None
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+class BillAnalytics:
+    """Running aggregates over one account's bills in period order.
+
+    Only the last ``LOOKBACK`` bills are kept.  Rolling usage sums are
+    updated as bills are added and evicted, so each new bill costs the same
+    regardless of how long the history is.  Missing usage or amounts count
+    as zero, matching the long-term statistics.
+    """
+
+    def __init__(self):
+        """Initialize empty aggregates."""
+        # (账期, 金额, 用水量)
+        self._bills = deque(maxlen=LOOKBACK)
+        self._usage_by_period = {}
+        self._usage_sums = {window: 0.0 for window in ROLLING_WINDOWS}
+        self.values = {}
+
+    def add(self, period, total_amount, usage):
+        """追加一个账期；账期不晚于已有的最新账期时返回False。"""
+        if self._bills and period <= self._bills[-1][0]:
+            return False
+        total_amount = total_amount or 0.0
+        usage = usage or 0.0
+        bills = self._bills
+        for window in ROLLING_WINDOWS:
+            self._usage_sums[window] += usage
+            if len(bills) >= window:
+                self._usage_sums[window] -= bills[-window][2]
+        if len(bills) == bills.maxlen:
+            self._usage_by_period.pop(bills[0][0], None)
+        previous = bills[-1] if bills else None
+        bills.append((period, total_amount, usage))
+        self._usage_by_period[period] = usage
+        self._update_values(previous)
+        return True
+
+    def extend(self, rows):
+        """按顺序追加多行账单，有乱序时返回False，调用方应重建。"""
+        for row in rows:
+            if not self.add(row[0], row[1], row[2]):
+                return False
+        return True
+
+    def _update_values(self, previous):
+        period, total_amount, usage = self._bills[-1]
+        count = len(self._bills)
+        values = {
+            "usage_delta": _round(usage - previous[2]) if previous else None,
+            "amount_delta": _round(total_amount - previous[1]) if previous else None,
+            "price": _round(total_amount / usage) if usage else None,
+            "usage_yoy": None,
+        }
+        for window in ROLLING_WINDOWS:
+            values[f"usage_avg_{window}"] = (
+                _round(self._usage_sums[window] / window) if count >= window else None
+            )
+        last_year = self._usage_by_period.get(_previous_year(period))
+        if last_year:
+            values["usage_yoy"] = _round((usage - last_year) / last_year * 100)
+        self.values = values
@@ -0,0 +1,724 @@
+"""Async API client for the gzwater integration."""
+
+import asyncio
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from .parser import (
+    BILL_EXTRACTOR,
+    has_more_pages,
+    parse_html_for_bill_data,
+)
+from .metrics import NULL_METRICS
+from .router import EndpointRouter
+
+_LOGGER = logging.getLogger(__name__)
+
+BASE_URL = "https://service.gzwatersupply.com"
+BIND_PAGE_PATH = "/api/gsxmcp/rg/um/v1.0/user/bindPage"
+LOGIN_PATH = "/api/login"
+BILL_QUERY_PATH = "/api/bill/query"
+# 历史账单接口，startPeriod 之后（不含）的账期按页返回
+BILL_HISTORY_PATH = "/api/user/bills"
+
+# 备用API端点列表，{user_id} 会被替换为账号
+ALTERNATIVE_ENDPOINTS = [
+    "/api/bill/query?account={user_id}",
+    "/bill/query",
+    "/api/user/bills?account={user_id}",
+]
+
+DEFAULT_HEADERS = {
+    "content-type": "application/json",
+    "Accept": "*/*",
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 18_6_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148 MicroMessenger/8.0.65(0x1800412b) NetType/WIFI Language/zh_CN",
+    "Referer": "https://servicewechat.com/wx57c5715fd3a99e4a/171/page-frame.html",
+}
+
+# 获取策略名称
+STRATEGY_BIND_PAGE = "bind_page"
+STRATEGY_ALTERNATIVE = "alternative"
+STRATEGY_LOGIN = "login"
+
+# 会话到期前多久重新登录（秒）
+REAUTH_MARGIN = 300
+# 账号改用备用策略后，多久重新优先尝试bindPage（秒）
+PRIMARY_REPROBE_INTERVAL = 6 * 3600
+# 负载均衡和防火墙下发的Cookie，与登录状态无关，过期后直接丢弃，不触发重新登录
+NON_AUTH_COOKIES = frozenset(["acw_tc", "acw_sc__v2", "aliyungf_tc", "SERVERID", "cdn_sec_tc"])
+
+BIND_PAGE_SIZE = 10
+HISTORY_PAGE_SIZE = 50
+BIND_PAGE_TIMEOUT = 15
+REQUEST_TIMEOUT = 10
+
+
+class GzWaterApiError(Exception):
+    """Error raised when the gzwater service cannot be queried."""
+
+
+class GzWaterAuthError(GzWaterApiError):
+    """Error raised when the service rejects the session (403)."""
+
+
+class GzWaterParseError(GzWaterApiError):
+    """Error raised when a response is not in the expected format."""
+
+
+class GzWaterEndpointError(GzWaterApiError):
+    """Error raised when an endpoint itself fails (network error or 5xx)."""
+
+
+def _status_error(status, message):
+    """根据状态码构造异常：5xx是端点故障，其余与账号有关。"""
+    if status >= 500:
+        return GzWaterEndpointError(message)
+    return GzWaterApiError(message)
+
+
+class RateLimiter:
+    """Spread requests so that at most ``rate`` are started per second.
+
+    One limiter is shared by every account client, making the limit global
+    for the integration rather than per account.
+    """
+
+    def __init__(self, rate):
+        """Initialize the limiter; a falsy rate disables limiting."""
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+
+    async def async_acquire(self):
+        """等待直到下一个请求时间片可用。"""
+        if not self._interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # 预留时间片后再等待，保证并发调用者按顺序错开
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class SingleFlight:
+    """Coalesce concurrent fetches that share a key.
+
+    Callers arriving while a fetch for the same key is in flight wait for
+    that fetch instead of starting their own, and for ``freshness`` seconds
+    after it completes they get its result straight away.  Failures are not
+    cached.  One instance is shared by all clients so that every trigger for
+    an account ends up in the same flight.
+    """
+
+    def __init__(self, freshness):
+        """Initialize with the freshness window in seconds."""
+        self.freshness = freshness
+        self._in_flight = {}
+        # key -> (完成时间, 结果)
+        self._results = {}
+
+    async def async_do(self, key, fetch):
+        """返回key对应的结果：新鲜的缓存、进行中的请求或新发起的请求。"""
+        loop = asyncio.get_running_loop()
+        cached = self._results.get(key)
+        if cached is not None and loop.time() - cached[0] < self.freshness:
+            return cached[1]
+        task = self._in_flight.get(key)
+        if task is None:
+            task = loop.create_task(self._async_run(key, fetch))
+            self._in_flight[key] = task
+        # 某个调用者被取消时不影响其他等待同一请求的调用者
+        return await asyncio.shield(task)
+
+    async def _async_run(self, key, fetch):
+        try:
+            result = await fetch()
+        finally:
+            del self._in_flight[key]
+        self._results[key] = (asyncio.get_running_loop().time(), result)
+        return result
+
+
+def _cookie_expiry(morsel, now):
+    """返回Set-Cookie的过期时间戳，会话Cookie返回None。"""
+    max_age = morsel["max-age"]
+    if max_age:
+        try:
+            return now + int(max_age)
+        except ValueError:
+            pass
+    expires = morsel["expires"]
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def _find_login_token(login_data, now):
+    """从登录响应中查找令牌，返回 {"value", "expires"} 或None。"""
+    if not isinstance(login_data, dict):
+        return None
+    candidates = [login_data]
+    if isinstance(login_data.get("data"), dict):
+        candidates.append(login_data["data"])
+    for candidate in candidates:
+        for key in ("token", "accessToken", "access_token"):
+            if candidate.get(key):
+                expires = None
+                for expiry_key in ("expiresIn", "expires_in", "expire"):
+                    if candidate.get(expiry_key):
+                        try:
+                            expires = now + int(candidate[expiry_key])
+                        except (TypeError, ValueError):
+                            pass
+                        break
+                return {"value": str(candidate[key]), "expires": expires}
+    return None
+
+
+def _bill_from_json(bill_data):
+    """从JSON账单数据构造传感器数据，无法提取时返回None。"""
+    bill = BILL_EXTRACTOR.first_complete(bill_data)
+    if bill is None:
+        return None
+    return {
+        "total_amount": bill["total_amount"],
+        "usage": bill["usage"],
+        "bill_date": bill["bill_date"] or datetime.datetime.now().strftime("%Y-%m-%d"),
+        "period": bill["period"],
+    }
+
+
+def _parse_bill_response(text):
+    """解析JSON或HTML格式的账单响应。"""
+    try:
+        bill_data = json.loads(text)
+    except json.JSONDecodeError:
+        # 如果不是JSON，尝试解析HTML
+        return parse_html_for_bill_data(text)
+    return _bill_from_json(bill_data)
+
+
+class _Response:
+    """Status, headers and raw body of a completed request."""
+
+    __slots__ = ("status", "headers", "body", "encoding")
+
+    def __init__(self, status, headers, body, encoding):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        """Return the body decoded with the response encoding."""
+        return self.body.decode(self.encoding, errors="replace")
+
+
+class _CachedResponse:
+    """Validators, body digest and parse result of the last 200 response."""
+
+    __slots__ = ("etag", "last_modified", "digest", "result")
+
+    def __init__(self, etag, last_modified, digest, result):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.result = result
+
+
+class GzWaterApiClient:
+    """Fetch bill data for one account over a shared aiohttp session.
+
+    The session is expected to use a ``DummyCookieJar``; cookies are kept per
+    client so that accounts sharing the connection pool never mix sessions.
+    Cookies and the login token are tracked with their expiry times; pass
+    ``session_state`` to resume a saved session and ``on_session_update`` to
+    be told whenever it changes.  Fetch strategies are ordered by ``router``,
+    which should be shared between clients; the account's own last successful
+    strategy goes first, and bindPage is tried first again every
+    ``PRIMARY_REPROBE_INTERVAL`` seconds.  Only network errors and 5xx
+    responses count against the shared circuit breakers.  Setting ``hedge_delay`` races
+    the alternative endpoints, starting the next one every ``hedge_delay``
+    seconds (0 starts them all at once).
+
+    GET responses are fingerprinted by ETag/Last-Modified or a body digest;
+    when nothing changed the previous result object is returned unparsed.
+    ``metrics`` receives per-stage timings and counters; without it every
+    instrumentation call goes to a no-op stand-in.  With ``single_flight``,
+    concurrent ``async_get_bill_data`` calls for the same account share one
+    fetch.
+    """
+
+    def __init__(
+        self,
+        session,
+        user_id,
+        password,
+        base_url=BASE_URL,
+        rate_limiter=None,
+        page_size=BIND_PAGE_SIZE,
+        prefetch=True,
+        session_state=None,
+        on_session_update=None,
+        router=None,
+        hedge_delay=None,
+        metrics=None,
+        single_flight=None,
+    ):
+        """Initialize the client."""
+        self._session = session
+        self._rate_limiter = rate_limiter
+        self._router = router if router is not None else EndpointRouter()
+        self.hedge_delay = hedge_delay
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self._single_flight = single_flight
+        self._attempts = 0
+        # 本账号上次成功的策略及其成为首选的时间
+        self._preferred = None
+        self._preferred_since = None
+        # 路径 -> 上次的响应指纹和解析结果
+        self._response_cache = {}
+        self._last_bind_result = None
+        # 策略名 -> 获取函数，顺序即初始的尝试顺序
+        self._strategies = {STRATEGY_BIND_PAGE: self.async_fetch_bind_page}
+        for endpoint in ALTERNATIVE_ENDPOINTS:
+            self._strategies[f"{STRATEGY_ALTERNATIVE}:{endpoint}"] = functools.partial(
+                self.async_fetch_alternative_endpoint, endpoint
+            )
+        self._strategies[STRATEGY_LOGIN] = self.async_fetch_with_login
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.user_id = user_id
+        self.password = password
+        self.base_url = base_url.rstrip("/")
+        self._on_session_update = on_session_update
+        # name -> [value, 过期时间戳或None]
+        self._cookies = {}
+        self._token = None
+        if session_state:
+            self._cookies = {
+                name: list(cookie) for name, cookie in session_state.get("cookies", {}).items()
+            }
+            self._token = session_state.get("token")
+
+    @property
+    def session_state(self):
+        """Return the current cookies and token in a JSON-serializable form."""
+        return {"cookies": self._cookies, "token": self._token}
+
+    def session_needs_login(self, now=None):
+        """登录会话不存在或即将过期时返回True。
+
+        只看令牌和登录Cookie的有效期；NON_AUTH_COOKIES 中的Cookie过期后被丢弃，
+        由服务器在下一次响应中重新下发。
+        """
+        now = now or time.time()
+        self._drop_expired_cookies(now)
+        auth_cookies = [
+            expires for name, (_, expires) in self._cookies.items() if name not in NON_AUTH_COOKIES
+        ]
+        if not auth_cookies and self._token is None:
+            return True
+        deadline = now + REAUTH_MARGIN
+        expiries = auth_cookies
+        if self._token is not None:
+            expiries.append(self._token["expires"])
+        return any(expires is not None and expires <= deadline for expires in expiries)
+
+    def _drop_expired_cookies(self, now):
+        """丢弃已过期的非登录Cookie。"""
+        expired = [
+            name
+            for name, (_, expires) in self._cookies.items()
+            if name in NON_AUTH_COOKIES and expires is not None and expires <= now
+        ]
+        for name in expired:
+            del self._cookies[name]
+
+    def _clear_session(self):
+        """丢弃当前会话。"""
+        self._cookies = {}
+        self._token = None
+        self._notify_session_update()
+
+    def _notify_session_update(self):
+        """通知会话已更新，以便持久化。"""
+        if self._on_session_update is not None:
+            self._on_session_update(self.user_id, self.session_state)
+
+    async def _request(self, method, path, timeout, headers=None, **kwargs):
+        """发送请求并返回 _Response。"""
+        request_headers = dict(DEFAULT_HEADERS)
+        if headers:
+            request_headers.update(headers)
+        self._drop_expired_cookies(time.time())
+        if self._cookies:
+            request_headers["Cookie"] = "; ".join(
+                f"{name}={value}" for name, (value, _) in self._cookies.items()
+            )
+        if self._token is not None:
+            request_headers["Authorization"] = f"Bearer {self._token['value']}"
+        if self._rate_limiter is not None:
+            await self._rate_limiter.async_acquire()
+        try:
+            async with self._session.request(
+                method,
+                f"{self.base_url}{path}",
+                headers=request_headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                **kwargs,
+            ) as response:
+                body = await response.read()
+                self.metrics.record_request(len(body))
+                if response.cookies:
+                    now = time.time()
+                    for name, morsel in response.cookies.items():
+                        self._cookies[name] = [morsel.value, _cookie_expiry(morsel, now)]
+                    self._notify_session_update()
+                return _Response(
+                    response.status, response.headers, body, response.get_encoding()
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise GzWaterEndpointError(f"网络请求错误: {err!r}") from err
+
+    async def _async_get_parsed(self, path, timeout, parse):
+        """GET并解析响应，内容未变化时跳过解析直接返回上次的结果。
+
+        支持ETag/Last-Modified的服务器返回304；否则比较响应体的摘要。
+        返回 (状态码, 解析结果, 是否未变化)，状态码非200时解析结果为None。
+        """
+        cached = self._response_cache.get(path)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        response = await self._request("GET", path, timeout, headers=headers)
+        if response.status == 304 and cached is not None:
+            self.metrics.record_cache_hit()
+            return 200, cached.result, True
+        if response.status != 200:
+            return response.status, None, False
+
+        digest = hashlib.blake2b(response.body, digest_size=16).digest()
+        if cached is not None and cached.digest == digest:
+            self.metrics.record_cache_hit()
+            return 200, cached.result, True
+        with self.metrics.stage("parse"):
+            result = parse(response.text)
+        self._response_cache[path] = _CachedResponse(
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            digest,
+            result,
+        )
+        return 200, result, False
+
+    async def async_get_bill_data(self):
+        """获取账单数据，同一账号的并发调用合并为一次请求。"""
+        if self._single_flight is None:
+            return await self._async_fetch_bill_data()
+        return await self._single_flight.async_do(self.user_id, self._async_fetch_bill_data)
+
+    async def _async_fetch_bill_data(self):
+        """按路由器给出的顺序尝试各获取策略。
+
+        会话仍然有效时只需一次bindPage请求；会话即将过期时先重新登录。
+        上次成功的策略最先尝试，熔断中的策略直接跳过；全部失败时抛出GzWaterApiError。
+        """
+        if self.session_needs_login():
+            try:
+                await self.async_login()
+            except GzWaterApiError as err:
+                _LOGGER.error("提前登录失败: %s", err)
+
+        self._attempts = 0
+        if (
+            self._preferred not in (None, STRATEGY_BIND_PAGE)
+            and time.monotonic() - self._preferred_since >= PRIMARY_REPROBE_INTERVAL
+        ):
+            # 定期重新优先尝试bindPage，恢复后可重新获得表号列表
+            self._preferred = None
+        names = self._router.order(self._strategies, self._preferred)
+        while names:
+            name = names.pop(0)
+            if self.hedge_delay is not None and name.startswith(STRATEGY_ALTERNATIVE):
+                # 对冲模式：将剩余的备用端点一起竞速
+                group = [name] + [n for n in names if n.startswith(STRATEGY_ALTERNATIVE)]
+                names = [n for n in names if not n.startswith(STRATEGY_ALTERNATIVE)]
+                result = await self._async_race_strategies(group)
+            else:
+                result = await self._async_run_strategy(name)
+            if result is not None:
+                return result
+
+        raise GzWaterApiError("所有获取策略都失败")
+
+    async def _async_run_strategy(self, name):
+        """执行一个获取策略并记录结果，失败或被熔断时返回None。"""
+        if not self._router.allow(name):
+            _LOGGER.debug("策略 %s 熔断中，跳过", name)
+            return None
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self._attempts += 1
+        depth = self._attempts - 1
+        try:
+            with self.metrics.stage(name):
+                result = await self._strategies[name]()
+        except GzWaterAuthError as err:
+            # 会话失效不是端点故障，不计入熔断统计
+            self._router.abandon(name)
+            self._drop_preferred(name)
+            _LOGGER.error("策略 %s 访问被拒绝，Cookie可能已过期: %s", name, err)
+            self._clear_session()
+            return None
+        except GzWaterEndpointError as err:
+            self._router.record_failure(name, loop.time() - start)
+            self._drop_preferred(name)
+            _LOGGER.warning("策略 %s 获取水费数据失败: %s", name, err)
+            return None
+        except GzWaterApiError as err:
+            # 4xx和解析失败只与本账号有关，不影响其他账号共享的熔断器
+            self._router.abandon(name)
+            self._drop_preferred(name)
+            _LOGGER.warning("策略 %s 获取水费数据失败: %s", name, err)
+            return None
+        except asyncio.CancelledError:
+            self._router.abandon(name)
+            raise
+        self._router.record_success(name, loop.time() - start)
+        self.metrics.record_strategy(name, depth)
+        if name != self._preferred:
+            self._preferred = name
+            self._preferred_since = time.monotonic()
+        return result
+
+    def _drop_preferred(self, name):
+        if self._preferred == name:
+            self._preferred = None
+
+    async def _async_race_strategies(self, names):
+        """对冲请求：每隔hedge_delay秒发出下一个策略，取第一个有效结果。
+
+        先完成的策略失败时立即发出下一个；拿到结果后取消其余请求。
+        """
+        remaining = list(names)
+        pending = set()
+        try:
+            while remaining or pending:
+                if remaining:
+                    pending.add(asyncio.ensure_future(self._async_run_strategy(remaining.pop(0))))
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        return result
+        finally:
+            for task in pending:
+                task.cancel()
+            # 等待被取消的请求结束，让它们的路由记录在返回前完成
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        return None
+
+    async def _async_fetch_bind_page(self, page_number):
+        """获取并解析bindPage接口的一页数据。
+
+        返回 (本页的绑定记录, 是否还有下一页, 内容是否未变化)。
+        """
+
+        def parse(text):
+            try:
+                page = json.loads(text)
+            except json.JSONDecodeError as err:
+                raise GzWaterParseError("bindPage响应不是有效的JSON格式") from err
+            records = BILL_EXTRACTOR.records(page)
+            more = has_more_pages(page, page_number, len(records), self.page_size)
+            return [BILL_EXTRACTOR.extract_record(record) for record in records], more
+
+        status, result, unchanged = await self._async_get_parsed(
+            f"{BIND_PAGE_PATH}?meter=hide&pageSize={self.page_size}&pageNumber={page_number}",
+            BIND_PAGE_TIMEOUT,
+            parse,
+        )
+        _LOGGER.debug("bindPage第%s页响应状态码: %s, 未变化: %s", page_number, status, unchanged)
+
+        if status == 403:
+            raise GzWaterAuthError("访问被拒绝(403)")
+        if status != 200:
+            raise _status_error(status, f"请求失败，状态码: {status}")
+        bindings, more = result
+        return bindings, more, unchanged
+
+    async def _async_iter_bind_pages(self):
+        """逐页遍历bindPage接口，产出 (本页的绑定记录, 内容是否未变化)。
+
+        启用预取时，在处理当前页的同时请求下一页；任何时刻最多只保留
+        两页数据在内存中。
+        """
+        page_number = 1
+        pending = asyncio.ensure_future(self._async_fetch_bind_page(page_number))
+        try:
+            while pending is not None:
+                bindings, more, unchanged = await pending
+                pending = None
+                if more:
+                    page_number += 1
+                    next_page = self._async_fetch_bind_page(page_number)
+                    if self.prefetch:
+                        pending = asyncio.ensure_future(next_page)
+                    else:
+                        pending = next_page
+                yield bindings, unchanged
+        finally:
+            # 提前停止遍历时取消尚未完成的预取
+            if isinstance(pending, asyncio.Future):
+                pending.cancel()
+            elif pending is not None:
+                pending.close()
+
+    async def async_fetch_bind_page(self):
+        """使用Cookie从bindPage接口获取所有绑定户号的数据。
+
+        逐页处理，第一个有完整数据的户号作为主数据，每个有完整数据的户号
+        按表号保存在 ``meters`` 中；只保留当前页和各户号的账单字段，不缓存
+        原始页面。所有页面都未变化时直接返回上次的结果对象。
+        """
+        _LOGGER.debug("使用Cookie直接获取水费数据")
+        primary = None
+        meters = {}
+        changed = False
+        async for page_bindings, unchanged in self._async_iter_bind_pages():
+            changed = changed or not unchanged
+            for binding in page_bindings:
+                if binding["total_amount"] is None or binding["usage"] is None:
+                    continue
+                if primary is None:
+                    primary = binding
+                if binding["id"] is not None and binding["id"] not in meters:
+                    meters[binding["id"]] = binding
+        if not changed and self._last_bind_result is not None:
+            _LOGGER.debug("bindPage内容未变化，跳过解析")
+            return self._last_bind_result
+
+        if primary is None:
+            raise GzWaterParseError("无法从bindPage响应中提取有效数据")
+        BILL_EXTRACTOR.normalize(primary)
+        for binding in meters.values():
+            if binding is not primary:
+                BILL_EXTRACTOR.normalize(binding)
+        self._last_bind_result = {
+            "total_amount": primary["total_amount"],
+            "usage": primary["usage"],
+            "bill_date": primary["bill_date"] or datetime.datetime.now().strftime("%Y-%m-%d"),
+            "period": primary["period"],
+            "meters": {
+                meter_id: {
+                    "total_amount": binding["total_amount"],
+                    "usage": binding["usage"],
+                    "bill_date": binding["bill_date"],
+                    "period": binding["period"],
+                }
+                for meter_id, binding in meters.items()
+            },
+        }
+        return self._last_bind_result
+
+    async def async_iter_history(self, since=None):
+        """逐页获取历史账单，只产出账期晚于 since (YYYY-MM) 的账单。
+
+        服务器忽略 startPeriod 时仍在本地按账期过滤。
+        """
+        page_number = 1
+        while True:
+            path = (
+                f"{BILL_HISTORY_PATH}?account={self.user_id}&pageSize={HISTORY_PAGE_SIZE}"
+                f"&pageNumber={page_number}"
+            )
+            if since:
+                path += f"&startPeriod={since}"
+            response = await self._request("GET", path, REQUEST_TIMEOUT)
+            if response.status == 403:
+                raise GzWaterAuthError("访问被拒绝(403)")
+            if response.status != 200:
+                raise _status_error(
+                    response.status, f"历史账单请求失败，状态码: {response.status}"
+                )
+            try:
+                page = json.loads(response.text)
+            except json.JSONDecodeError as err:
+                raise GzWaterParseError("历史账单响应不是有效的JSON格式") from err
+
+            records = BILL_EXTRACTOR.records(page)
+            for record in records:
+                bill = BILL_EXTRACTOR.normalize(BILL_EXTRACTOR.extract_record(record))
+                if bill["period"] and (since is None or bill["period"] > since):
+                    yield bill
+            if not has_more_pages(page, page_number, len(records), HISTORY_PAGE_SIZE):
+                return
+            page_number += 1
+
+    async def async_fetch_alternative_endpoint(self, endpoint):
+        """从单个备用API端点获取数据。"""
+        path = endpoint.format(user_id=self.user_id)
+        _LOGGER.debug("尝试备用端点: %s", path)
+        status, result, _ = await self._async_get_parsed(path, REQUEST_TIMEOUT, _parse_bill_response)
+        if status != 200:
+            raise _status_error(status, f"备用端点 {path} 请求失败，状态码: {status}")
+        if not result:
+            raise GzWaterParseError(f"无法解析备用端点 {path} 的响应")
+        return result
+
+    async def async_login(self):
+        """使用用户名和密码登录，记录新的Cookie和令牌。"""
+        _LOGGER.debug("账号 %s 登录", self.user_id)
+        self._cookies = {}
+        self._token = None
+        with self.metrics.stage("login"):
+            response = await self._request(
+                "POST",
+                LOGIN_PATH,
+                REQUEST_TIMEOUT,
+                json={"account": self.user_id, "password": self.password},
+            )
+        if response.status >= 400:
+            raise GzWaterAuthError(f"登录失败，状态码: {response.status}")
+
+        try:
+            self._token = _find_login_token(json.loads(response.text), time.time())
+        except json.JSONDecodeError:
+            pass
+        self._notify_session_update()
+
+    async def async_fetch_with_login(self):
+        """备用方案：使用用户名和密码登录获取数据。"""
+        _LOGGER.info("使用备用登录方式获取数据")
+        if self.session_needs_login():
+            await self.async_login()
+
+        status, result, _ = await self._async_get_parsed(
+            BILL_QUERY_PATH, REQUEST_TIMEOUT, _parse_bill_response
+        )
+        if status >= 400:
+            raise _status_error(status, f"账单请求失败，状态码: {status}")
+        if result is None:
+            raise GzWaterParseError("无法解析登录后的账单数据")
+        return result
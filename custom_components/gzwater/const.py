@@ -3,8 +3,34 @@
 DOMAIN = "gzwater"
 CONF_USER_ID = "user_id"
 CONF_PASSWORD = "password"
+CONF_ACCOUNTS = "accounts"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_HEDGE_DELAY = "hedge_delay"
+CONF_DIAGNOSTICS = "diagnostics"
+CONF_FRESHNESS = "freshness"
+CONF_MAX_STALENESS = "max_staleness"
 SCAN_INTERVAL = 86400  # 每天更新一次
 
+STARTUP_REFRESH_JITTER = 60  # 启动完成后首次刷新的最大随机延迟（秒）
+
+DEFAULT_MAX_CONCURRENCY = 4  # 同时刷新的账号数上限
+DEFAULT_RATE_LIMIT = 5.0  # 全局每秒最多请求数
+DEFAULT_FRESHNESS = 60  # 刚获取的结果在多少秒内直接复用
+DEFAULT_MAX_STALENESS = 7 * 86400  # 获取失败时旧数据最长可用多少秒
+
+SIGNAL_METRICS_UPDATED = f"{DOMAIN}_metrics_updated"
+
+# 导出历史账单服务
+SERVICE_EXPORT_BILLS = "export_bills"
+ATTR_FILENAME = "filename"
+ATTR_FORMAT = "format"
+ATTR_ACCOUNTS = "accounts"
+ATTR_START = "start"
+ATTR_END = "end"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_JSONL = "jsonl"
+
 # 传感器类型
 SENSOR_TYPE_TOTAL_AMOUNT = "total_amount"
 SENSOR_TYPE_USAGE = "usage"
@@ -27,3 +53,71 @@ SENSOR_TYPES = {
         "icon": "mdi:calendar",
     },
 }
+
+# 分析传感器类型，值由历史账单增量计算
+ANALYTICS_SENSOR_TYPES = {
+    "usage_delta": {
+        "name": "用水量环比变化",
+        "unit": "m³",
+        "icon": "mdi:delta",
+    },
+    "amount_delta": {
+        "name": "水费环比变化",
+        "unit": "元",
+        "icon": "mdi:delta",
+    },
+    "usage_avg_3": {
+        "name": "近3期平均用水量",
+        "unit": "m³",
+        "icon": "mdi:chart-line",
+    },
+    "usage_avg_12": {
+        "name": "近12期平均用水量",
+        "unit": "m³",
+        "icon": "mdi:chart-line",
+    },
+    "usage_yoy": {
+        "name": "用水量同比变化",
+        "unit": "%",
+        "icon": "mdi:calendar-compare",
+    },
+    "price": {
+        "name": "平均水价",
+        "unit": "元/m³",
+        "icon": "mdi:cash",
+    },
+}
+
+# 诊断传感器类型，仅在启用 diagnostics 时创建
+DIAGNOSTIC_SENSOR_TYPES = {
+    "duration": {
+        "name": "刷新耗时",
+        "unit": "ms",
+        "icon": "mdi:timer-outline",
+    },
+    "requests": {
+        "name": "请求数",
+        "unit": None,
+        "icon": "mdi:swap-vertical",
+    },
+    "bytes_received": {
+        "name": "接收字节数",
+        "unit": "B",
+        "icon": "mdi:download",
+    },
+    "strategy": {
+        "name": "成功策略",
+        "unit": None,
+        "icon": "mdi:routes",
+    },
+    "fallback_depth": {
+        "name": "回退深度",
+        "unit": None,
+        "icon": "mdi:stairs-down",
+    },
+    "cache_hits": {
+        "name": "缓存命中数",
+        "unit": None,
+        "icon": "mdi:cached",
+    },
+}
@@ -0,0 +1,245 @@
+"""Data update coordinator for the gzwater integration."""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .analytics import LOOKBACK, BillAnalytics
+from .api import GzWaterApiError
+from .const import (
+    DOMAIN,
+    SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_STALENESS,
+    SIGNAL_METRICS_UPDATED,
+)
+from .scheduler import CADENCE_SAMPLES, RefreshScheduler
+from .stats import async_import_bill_statistics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GzWaterDataUpdateCoordinator(DataUpdateCoordinator):
+    """Class to manage fetching data for several gzwater accounts.
+
+    ``data`` maps each account's ``user_id`` to its latest bill dict.  All
+    accounts are refreshed concurrently, at most ``max_concurrency`` at a
+    time, so a refresh takes about as long as the slowest account.
+
+    Accounts are refreshed on their own schedule: ``scheduler`` learns each
+    account's billing cadence from the history store and a refresh only
+    fetches the accounts that are due.  ``update_interval`` is recomputed
+    after every refresh to wake up when the next account is due.
+
+    When a ``history`` store is given, each account's new bills are synced
+    into it after a changed refresh and imported into long-term statistics.
+    ``analytics`` holds each account's running aggregates, rebuilt from the
+    latest bills at startup and extended as new bills are stored.
+    Changed data is also written to ``data_store`` so it can be restored on
+    the next start.
+
+    An account whose fetch fails keeps serving its last good data and is
+    marked stale until a retry succeeds.  Once that data is older than
+    ``max_staleness`` seconds the account is reported as unavailable.
+    """
+
+    def __init__(
+        self,
+        hass,
+        clients,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        history=None,
+        account_names=None,
+        data_store=None,
+        max_staleness=DEFAULT_MAX_STALENESS,
+    ):
+        """Initialize the coordinator."""
+        self.clients = {client.user_id: client for client in clients}
+        self.history = history
+        self.account_names = account_names or {}
+        self.data_store = data_store
+        self.scheduler = RefreshScheduler()
+        self.analytics = {}
+        self.max_staleness = timedelta(seconds=max_staleness)
+        # 账号 -> 最近一次成功获取的时间
+        self.fetched_at = {}
+        # 正在使用旧数据的账号：最近一次获取失败，或恢复后尚未刷新
+        self.stale = set()
+        self._availability = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.data = {}
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=timedelta(seconds=SCAN_INTERVAL),
+            # 账单未变化时客户端返回同一个结果对象，数据相等则不通知实体
+            always_update=False,
+        )
+
+    def restore(self, data, fetched_at):
+        """使用上次保存的数据，在首次刷新成功前标记为旧数据。"""
+        self.data = {
+            user_id: bill for user_id, bill in data.items() if user_id in self.clients
+        }
+        self.fetched_at = {
+            user_id: value for user_id, value in fetched_at.items() if user_id in self.data
+        }
+        self.stale = set(self.data)
+        self._availability = self._account_availability(self.data, dt_util.utcnow())
+
+    def is_available(self, user_id):
+        """账号有数据且数据没有超过最长可用时间。"""
+        return self._availability.get(user_id, False)
+
+    def _account_availability(self, data, now):
+        # 没有获取时间的数据视为可用，直到首次刷新
+        return {
+            user_id: user_id not in self.fetched_at
+            or now - self.fetched_at[user_id] <= self.max_staleness
+            for user_id in data
+        }
+
+    def _next_expiry(self, now):
+        """返回距离下一个账号数据过期的时间，没有时返回None。"""
+        remaining = [
+            self.fetched_at[user_id] + self.max_staleness - now
+            for user_id, available in self._availability.items()
+            if available and user_id in self.fetched_at
+        ]
+        return min(remaining) if remaining else None
+
+    async def async_load_analytics(self):
+        """从历史账单重建所有账号的统计值。"""
+        if self.history is None:
+            return
+        for user_id in self.clients:
+            await self._async_rebuild_analytics(user_id)
+
+    async def _async_rebuild_analytics(self, user_id):
+        rows = await self.hass.async_add_executor_job(
+            self.history.recent_bills, user_id, LOOKBACK
+        )
+        analytics = BillAnalytics()
+        analytics.extend(rows)
+        self.analytics[user_id] = analytics
+
+    async def async_request_refresh(self):
+        """Request a refresh that fetches every account.
+
+        This is the path taken by user-requested updates such as
+        ``homeassistant.update_entity``, which must not be skipped just
+        because no account is due yet.
+        """
+        self.scheduler.mark_due()
+        await super().async_request_refresh()
+
+    async def _async_fetch_account(self, client):
+        """在并发上限内获取单个账号的数据，数据变化时同步历史账单。"""
+        async with self._semaphore:
+            client.metrics.begin_refresh()
+            try:
+                data = await client.async_get_bill_data()
+                previous = (self.data or {}).get(client.user_id)
+                if self.history is not None and data is not previous:
+                    with client.metrics.stage("history"):
+                        await self._async_sync_history(client, data)
+                if self.history is not None and (
+                    data is not previous or not self.scheduler.learned(client.user_id)
+                ):
+                    bill_dates = await self.hass.async_add_executor_job(
+                        self.history.bill_dates, client.user_id, CADENCE_SAMPLES
+                    )
+                    self.scheduler.learn(client.user_id, bill_dates)
+                return data
+            finally:
+                client.metrics.end_refresh()
+
+    async def _async_sync_history(self, client, current):
+        """增量同步账号的历史账单：只获取高水位之后的账期。"""
+        user_id = client.user_id
+        since = await self.hass.async_add_executor_job(self.history.high_water_mark, user_id)
+        bills = []
+        try:
+            async for bill in client.async_iter_history(since):
+                bills.append(bill)
+        except GzWaterApiError as err:
+            _LOGGER.warning("账号 %s 同步历史账单失败: %s", user_id, err)
+        if current.get("period") and (since is None or current["period"] > since):
+            bills.append(current)
+        if not bills:
+            return
+
+        rows = await self.hass.async_add_executor_job(self.history.add_bills, user_id, bills)
+        _LOGGER.debug("账号 %s 新增 %s 个账期的历史账单", user_id, len(rows))
+        async_import_bill_statistics(self.hass, user_id, self.account_names.get(user_id), rows)
+        # 新账期接在最新账期之后时增量更新，补入了更早的账期时重建
+        analytics = self.analytics.get(user_id)
+        if analytics is None or not analytics.extend(rows):
+            await self._async_rebuild_analytics(user_id)
+
+    async def _async_update_data(self):
+        """从广州自来水96968平台获取到期账号的实际数据。"""
+        now = dt_util.utcnow()
+        due = [
+            client
+            for user_id, client in self.clients.items()
+            if self.scheduler.is_due(user_id, now)
+        ]
+        results = await asyncio.gather(
+            *(self._async_fetch_account(client) for client in due),
+            return_exceptions=True,
+        )
+        # 数据未变化时实体不会收到通知，诊断传感器通过单独的信号更新
+        if any(client.metrics.enabled for client in due):
+            async_dispatcher_send(self.hass, SIGNAL_METRICS_UPDATED)
+
+        # 未到期和失败的账号保留上一次的数据
+        previous = self.data or {}
+        data = {
+            user_id: previous[user_id] for user_id in self.clients if user_id in previous
+        }
+        errors = []
+        stale_before = set(self.stale)
+        finished = dt_util.utcnow()
+        for client, result in zip(due, results):
+            user_id = client.user_id
+            if isinstance(result, BaseException):
+                _LOGGER.error("账号 %s 获取水费数据失败: %s", user_id, result)
+                errors.append(result)
+                self.scheduler.record_failure(user_id, finished)
+                self.stale.add(user_id)
+                continue
+            _LOGGER.debug("账号 %s 成功获取水费数据: %s", user_id, result)
+            data[user_id] = result
+            self.scheduler.record_success(user_id, finished)
+            self.fetched_at[user_id] = finished
+            self.stale.discard(user_id)
+
+        # 旧数据标记或可用性变化时即使数据相同也要通知实体
+        availability = self._account_availability(data, finished)
+        notify = self.stale != stale_before or availability != self._availability
+        self._availability = availability
+
+        # 在下一个账号到期或下一份数据过期时醒来
+        self.update_interval = self.scheduler.next_update_interval(finished)
+        expiry = self._next_expiry(finished)
+        if expiry is not None and expiry < self.update_interval:
+            self.update_interval = expiry
+        _LOGGER.debug("下次刷新在 %s 后", self.update_interval)
+
+        if len(errors) < len(due) and self.data_store is not None:
+            self.data_store.async_save_data(data, self.fetched_at)
+        # 成功和失败时都在这里推送标记变化；先更新数据，实体读到的值和标记一致。
+        # 全部失败时协调器不会再通知实体，数据未变化时也不会
+        if notify:
+            self.data = data
+            self.async_update_listeners()
+        if errors and len(errors) == len(due):
+            raise UpdateFailed(f"无法获取广州市自来水数据: {errors[0]}")
+        return data
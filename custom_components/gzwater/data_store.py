@@ -0,0 +1,45 @@
+"""Persistent last-known bill data for the gzwater integration."""
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.data"
+SAVE_DELAY = 10
+
+
+class GzWaterDataStore:
+    """Keep the coordinator's last good data in ``.storage``.
+
+    The data is restored at startup so entities have their last values
+    immediately, before the first live fetch has run.  The time of each
+    account's last successful fetch is stored alongside, so the age of the
+    restored values is known.
+    """
+
+    def __init__(self, hass):
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data = {"bills": {}, "fetched_at": {}}
+
+    async def async_load(self):
+        """从磁盘加载上次的数据，返回 (账单数据, 获取时间)。"""
+        self._data = await self._store.async_load() or {"bills": {}, "fetched_at": {}}
+        fetched_at = {}
+        for user_id, value in self._data["fetched_at"].items():
+            parsed = dt_util.parse_datetime(value)
+            if parsed is not None:
+                fetched_at[user_id] = parsed
+        return self._data["bills"], fetched_at
+
+    @callback
+    def async_save_data(self, data, fetched_at):
+        """记录新的数据和获取时间并延迟写盘。"""
+        self._data = {
+            "bills": data,
+            "fetched_at": {user_id: value.isoformat() for user_id, value in fetched_at.items()},
+        }
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY)
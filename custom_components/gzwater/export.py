@@ -0,0 +1,103 @@
+"""Bill history export service for the gzwater integration."""
+
+import csv
+import json
+import logging
+
+import voluptuous as vol
+from homeassistant.const import CONF_NAME
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+
+from .const import (
+    DOMAIN,
+    CONF_USER_ID,
+    SERVICE_EXPORT_BILLS,
+    ATTR_FILENAME,
+    ATTR_FORMAT,
+    ATTR_ACCOUNTS,
+    ATTR_START,
+    ATTR_END,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_JSONL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ("account", "period", "total_amount", "usage", "bill_date")
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_FILENAME): cv.string,
+        vol.Optional(ATTR_FORMAT, default=EXPORT_FORMAT_CSV): vol.In(
+            [EXPORT_FORMAT_CSV, EXPORT_FORMAT_JSONL]
+        ),
+        vol.Optional(ATTR_ACCOUNTS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+    }
+)
+
+
+def export_bills(history, filename, fmt, accounts=None, start=None, end=None):
+    """将历史账单逐行写入文件，返回写入的行数。
+
+    账单按块从数据库读取并立即写出，内存占用与历史长度无关。
+    """
+    count = 0
+    with open(filename, "w", encoding="utf-8", newline="") as file:
+        rows = history.iter_bills(accounts, start, end)
+        if fmt == EXPORT_FORMAT_CSV:
+            writer = csv.writer(file)
+            writer.writerow(EXPORT_FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+                file.write("\n")
+                count += 1
+    return count
+
+
+def _resolve_accounts(hass, values):
+    """将账号ID或名称解析为账号ID。"""
+    user_ids = []
+    for value in values:
+        for account in hass.data[DOMAIN]["accounts"]:
+            if value in (account[CONF_USER_ID], account[CONF_NAME]):
+                user_ids.append(account[CONF_USER_ID])
+                break
+        else:
+            raise HomeAssistantError(f"未配置的账号: {value}")
+    return user_ids
+
+
+def async_register_services(hass):
+    """注册导出历史账单的服务。"""
+
+    async def _async_export_bills(call):
+        filename = hass.config.path(call.data[ATTR_FILENAME])
+        if not hass.config.is_allowed_path(filename):
+            raise HomeAssistantError(f"不允许写入路径: {filename}")
+        accounts = None
+        if ATTR_ACCOUNTS in call.data:
+            accounts = _resolve_accounts(hass, call.data[ATTR_ACCOUNTS])
+        # 日期按所在账期过滤
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        count = await hass.async_add_executor_job(
+            export_bills,
+            hass.data[DOMAIN]["history"],
+            filename,
+            call.data[ATTR_FORMAT],
+            accounts,
+            start.strftime("%Y-%m") if start else None,
+            end.strftime("%Y-%m") if end else None,
+        )
+        _LOGGER.info("已导出 %s 条历史账单到 %s", count, filename)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_EXPORT_BILLS, _async_export_bills, schema=EXPORT_SCHEMA
+    )
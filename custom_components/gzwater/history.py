@@ -0,0 +1,149 @@
+"""Local bill history store for the gzwater integration."""
+
+import logging
+import sqlite3
+import threading
+
+_LOGGER = logging.getLogger(__name__)
+
+HISTORY_DB_NAME = "gzwater_history.db"
+EXPORT_CHUNK_SIZE = 500  # 导出时每次从数据库读取的行数
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    account TEXT NOT NULL,
+    period TEXT NOT NULL,
+    total_amount REAL,
+    usage REAL,
+    bill_date TEXT,
+    PRIMARY KEY (account, period)
+) WITHOUT ROWID
+"""
+
+
+class BillHistoryStore:
+    """SQLite table with one row per account and billing period.
+
+    All methods block and must run in the executor.  The connection is shared
+    between executor threads and guarded by a lock.
+    """
+
+    def __init__(self, path):
+        """Initialize the store; call ``open`` before use."""
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """打开数据库并建表。"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def close(self):
+        """关闭数据库。"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+    def high_water_mark(self, account):
+        """返回账号已保存的最新账期，没有记录时返回None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(period) FROM bills WHERE account = ?", (account,)
+            ).fetchone()
+        return row[0]
+
+    def add_bills(self, account, bills):
+        """保存账单，已存在的账期被忽略。
+
+        返回从最早的新账期开始的所有行及其累计用水量和金额，
+        即需要写入（或重写）长期统计的部分；没有新账单时返回空列表。
+        """
+        rows = [
+            (account, bill["period"], bill["total_amount"], bill["usage"], bill.get("bill_date"))
+            for bill in bills
+            if bill.get("period")
+        ]
+        if not rows:
+            return []
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bills VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if self._conn.total_changes == before:
+                return []
+            earliest = min(row[1] for row in rows)
+            return self._conn.execute(
+                """
+                SELECT period, total_amount, usage, usage_sum, amount_sum FROM (
+                    SELECT period, total_amount, usage,
+                        SUM(COALESCE(usage, 0)) OVER (ORDER BY period) AS usage_sum,
+                        SUM(COALESCE(total_amount, 0)) OVER (ORDER BY period) AS amount_sum
+                    FROM bills WHERE account = ?
+                ) WHERE period >= ? ORDER BY period
+                """,
+                (account, earliest),
+            ).fetchall()
+
+    def bill_dates(self, account, limit):
+        """返回账号最近 limit 个账单的出账日期，按账期从新到旧。"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT bill_date FROM bills
+                WHERE account = ? AND bill_date IS NOT NULL
+                ORDER BY period DESC LIMIT ?
+                """,
+                (account, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def recent_bills(self, account, limit):
+        """返回账号最近 limit 个账期的 (账期, 金额, 用水量)，按账期从旧到新。"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT period, total_amount, usage FROM bills
+                WHERE account = ? ORDER BY period DESC LIMIT ?
+                """,
+                (account, limit),
+            ).fetchall()
+        rows.reverse()
+        return rows
+
+    def iter_bills(self, accounts=None, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """按账号和账期顺序逐块读取账单，产生 (账号, 账期, 金额, 用水量, 出账日期)。
+
+        使用单独的只读连接，导出期间不占用共享连接的锁。
+        """
+        clauses = []
+        params = []
+        if accounts:
+            clauses.append(f"account IN ({', '.join('?' * len(accounts))})")
+            params.extend(accounts)
+        if start is not None:
+            clauses.append("period >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("period <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(
+                f"""
+                SELECT account, period, total_amount, usage, bill_date FROM bills
+                {where} ORDER BY account, period
+                """,
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
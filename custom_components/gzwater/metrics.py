@@ -0,0 +1,110 @@
+"""Refresh instrumentation for the gzwater integration."""
+
+import contextlib
+import time
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class RefreshMetrics:
+    """Per-account counters and stage timings of the latest refresh.
+
+    Counters are reset by ``begin_refresh``; stage timings accumulate within a
+    refresh, so a stage entered twice (e.g. ``parse`` for several pages)
+    reports its total time.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.refreshes = 0
+        self.last_refresh = None
+        self.duration = None
+        self.stages = {}
+        self.requests = 0
+        self.bytes_received = 0
+        self.strategy = None
+        self.fallback_depth = 0
+        self.cache_hits = 0
+        self._started = None
+
+    def begin_refresh(self):
+        """开始一次刷新，清零本次的计数。"""
+        self.stages = {}
+        self.requests = 0
+        self.bytes_received = 0
+        self.strategy = None
+        self.fallback_depth = 0
+        self.cache_hits = 0
+        self._started = time.perf_counter()
+
+    def end_refresh(self):
+        """结束一次刷新，记录总耗时。"""
+        self.refreshes += 1
+        self.last_refresh = time.time()
+        self.duration = time.perf_counter() - self._started
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """统计一个阶段的耗时。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record_request(self, nbytes):
+        """记录一次请求及其响应大小。"""
+        self.requests += 1
+        self.bytes_received += nbytes
+
+    def record_cache_hit(self):
+        """记录一次内容未变化、跳过解析的响应。"""
+        self.cache_hits += 1
+
+    def record_strategy(self, name, depth):
+        """记录成功的策略以及此前尝试过的策略数。"""
+        self.strategy = name
+        self.fallback_depth = depth
+
+    def as_dict(self):
+        """Return the metrics in a JSON-serializable form."""
+        return {
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh,
+            "duration": self.duration,
+            "stages": dict(self.stages),
+            "requests": self.requests,
+            "bytes_received": self.bytes_received,
+            "strategy": self.strategy,
+            "fallback_depth": self.fallback_depth,
+            "cache_hits": self.cache_hits,
+        }
+
+
+class _NullMetrics:
+    """Stand-in used when instrumentation is disabled; every call is a no-op."""
+
+    enabled = False
+
+    def begin_refresh(self):
+        pass
+
+    def end_refresh(self):
+        pass
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def record_request(self, nbytes):
+        pass
+
+    def record_cache_hit(self):
+        pass
+
+    def record_strategy(self, name, depth):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
@@ -0,0 +1,396 @@
+"""Response parsers for the gzwater integration."""
+
+import datetime
+import json
+import logging
+import re
+from html.parser import HTMLParser
+
+_LOGGER = logging.getLogger(__name__)
+
+
+PERIOD_PATTERN = re.compile(r'^(\d{4})\D?(\d{1,2})')
+DATE_PATTERN = re.compile(r'^(\d{4})\D?(\d{1,2})\D?(\d{1,2})')
+
+
+def normalize_period(value):
+    """将 202406、2024-06、2024/6/15 等账期统一为 YYYY-MM。"""
+    match = PERIOD_PATTERN.match(str(value).strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"无效的账期: {value}")
+    return f"{match.group(1)}-{int(match.group(2)):02d}"
+
+
+def normalize_date(value):
+    """将 20240615、2024/6/15 等日期统一为 YYYY-MM-DD。"""
+    match = DATE_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f"无效的日期: {value}")
+    return datetime.date(
+        int(match.group(1)), int(match.group(2)), int(match.group(3))
+    ).isoformat()
+
+
+# 账单字段映射：字段名 -> (按优先级排列的候选键, 转换函数)
+# 新的响应格式只需在这里补充候选键；转换函数为None的字段保留原始值
+BILL_SCHEMA = {
+    "id": (['meterNo', 'userNo', 'accountNo', 'account', 'user_id', 'id'], str),
+    "total_amount": (['total_amount', 'amount', 'total', 'cost', 'price'], float),
+    "usage": (['usage', 'water_usage', 'consumption', 'volume', 'quantity'], float),
+    "period": (['period', 'billMonth', 'bill_month', 'billPeriod', 'month'], None),
+    "bill_date": (['bill_date', 'billDate', 'issueDate', 'readDate'], None),
+}
+
+# 只在需要时（主账单和历史账单）才规范化的字段，避免每条记录都做正则匹配
+DEFERRED_NORMALIZERS = {
+    "period": normalize_period,
+    "bill_date": normalize_date,
+}
+
+# 记录所在位置，按顺序尝试：
+# 列表路径下的每一项都是一条记录；对象路径本身带有标记字段时视为单条记录
+RECORD_LIST_PATHS = [
+    ('data', 'bills'),
+    ('data', 'list'),
+    ('data', 'items'),
+    ('data', 'records'),
+    ('data',),
+]
+RECORD_OBJECT_PATHS = [
+    ('data',),
+    (),
+]
+# 'total'也可能是分页总数，不作为记录的判断依据
+RECORD_MARKER_KEYS = ['total_amount', 'usage']
+
+# 最多缓存多少种记录键布局
+PLAN_CACHE_SIZE = 64
+
+# 分页信息字段
+PAGE_COUNT_KEYS = ['pages', 'totalPage', 'totalPages']
+TOTAL_COUNT_KEYS = ['total', 'totalCount', 'totalElements']
+
+
+def _resolve(json_data, path):
+    """沿路径取值，路径不存在时返回None。"""
+    value = json_data
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class BillExtractor:
+    """Extract bill records using a declarative field schema.
+
+    The schema is compiled once into a plan per record key layout that names
+    the one key each field reads from, so records after the first in a list
+    are extracted with direct lookups instead of an ``in`` probe per alias.
+    Period and date fields are kept raw until ``normalize`` is called, which
+    ``first_complete`` does for the record it returns.
+    """
+
+    def __init__(self, schema=BILL_SCHEMA, list_paths=RECORD_LIST_PATHS,
+                 object_paths=RECORD_OBJECT_PATHS, marker_keys=RECORD_MARKER_KEYS,
+                 normalizers=DEFERRED_NORMALIZERS):
+        """Compile the schema."""
+        self._normalizers = tuple(normalizers.items())
+        self._fields = tuple(
+            (field, tuple(keys), convert) for field, (keys, convert) in schema.items()
+        )
+        self._all_keys = frozenset(key for _, keys, _ in self._fields for key in keys)
+        self._list_paths = tuple(tuple(path) for path in list_paths)
+        self._object_paths = tuple(tuple(path) for path in object_paths)
+        self._marker_keys = frozenset(marker_keys)
+        self._plans = {}
+
+    def records(self, json_data):
+        """返回响应中的原始记录列表。
+
+        使用第一个非空的列表路径；都没有记录时使用带标记字段的对象。
+        """
+        for path in self._list_paths:
+            records = _resolve(json_data, path)
+            if isinstance(records, list):
+                records = [record for record in records if isinstance(record, dict)]
+                if records:
+                    return records
+        for path in self._object_paths:
+            record = _resolve(json_data, path)
+            if isinstance(record, dict) and not self._marker_keys.isdisjoint(record):
+                return [record]
+        return []
+
+    def _candidates(self, json_data):
+        """依次产生所有列表路径下的记录，然后是带标记字段的对象。"""
+        for path in self._list_paths:
+            records = _resolve(json_data, path)
+            if isinstance(records, list):
+                for record in records:
+                    if isinstance(record, dict):
+                        yield record
+        for path in self._object_paths:
+            record = _resolve(json_data, path)
+            if isinstance(record, dict) and not self._marker_keys.isdisjoint(record):
+                yield record
+
+    def _plan(self, key_layout):
+        """为一种键布局计算每个字段实际使用的键，结果会被缓存。
+
+        计划为 (全为None的结果模板, 直接取值的字段, 需要转换的字段)，
+        布局中没有的字段不出现在后两项中。
+        """
+        present = self._all_keys.intersection(key_layout)
+        template = {}
+        raw = []
+        converted = []
+        for field, keys, convert in self._fields:
+            template[field] = None
+            key = next((key for key in keys if key in present), None)
+            if key is None:
+                continue
+            if convert is None:
+                raw.append((field, key))
+            else:
+                converted.append((field, key, convert))
+        plan = (template, tuple(raw), tuple(converted))
+        if len(self._plans) >= PLAN_CACHE_SIZE:
+            self._plans.clear()
+        self._plans[key_layout] = plan
+        return plan
+
+    def extract_record(self, record):
+        """按字段映射提取单条记录，缺失或无效的字段为None。
+
+        同一响应中的记录通常键布局相同，因此按键布局缓存字段到键的映射，
+        之后每条记录只需按映射直接取值。
+        """
+        key_layout = tuple(record)
+        template, raw, converted = self._plans.get(key_layout) or self._plan(key_layout)
+        result = template.copy()
+        for field, key in raw:
+            result[field] = record[key]
+        for field, key, convert in converted:
+            value = record[key]
+            if value is not None:
+                try:
+                    result[field] = convert(value)
+                except (TypeError, ValueError):
+                    pass
+        return result
+
+    def normalize(self, result):
+        """规范化延迟处理的字段（账期、日期），无效值置为None，返回result。"""
+        for field, normalizer in self._normalizers:
+            value = result.get(field)
+            if value is not None:
+                try:
+                    result[field] = normalizer(value)
+                except (TypeError, ValueError):
+                    result[field] = None
+        return result
+
+    def extract(self, json_data):
+        """提取响应中的所有记录。"""
+        return [self.extract_record(record) for record in self.records(json_data)]
+
+    def first_complete(self, json_data):
+        """返回第一条同时有金额和用水量的记录，没有时返回None。
+
+        列表中没有完整记录时继续查找对象路径，兼容列表为空、
+        账单字段直接放在 data 或顶层的响应。
+        """
+        for record in self._candidates(json_data):
+            result = self.extract_record(record)
+            if result["total_amount"] is not None and result["usage"] is not None:
+                return self.normalize(result)
+        return None
+
+
+BILL_EXTRACTOR = BillExtractor()
+
+
+def extract_water_bill_info(json_data):
+    """从JSON响应中提取水费信息，返回 (水费总额, 用水量)。"""
+    result = BILL_EXTRACTOR.first_complete(json_data)
+    if result is None:
+        return None, None
+    return result["total_amount"], result["usage"]
+
+
+def has_more_pages(json_data, page_number, record_count, page_size):
+    """根据分页信息判断是否还有下一页。"""
+    if record_count == 0:
+        return False
+    data = json_data.get('data') if isinstance(json_data, dict) else None
+    if isinstance(data, dict):
+        try:
+            for key in PAGE_COUNT_KEYS:
+                if data.get(key) is not None:
+                    return page_number < int(data[key])
+            for key in TOTAL_COUNT_KEYS:
+                if data.get(key) is not None:
+                    return page_number * page_size < int(data[key])
+        except (TypeError, ValueError):
+            pass
+    # 没有分页信息时，满页说明可能还有下一页
+    return record_count >= page_size
+
+
+# HTML页面中的标签、数值和内嵌数据
+HTML_TEXT_TAGS = frozenset(['div', 'span', 'p'])
+HTML_AMOUNT_LABEL = re.compile(r'水费|金额|合计')
+HTML_USAGE_LABEL = re.compile(r'用水量|水量|吨数')
+HTML_AMOUNT_VALUE = re.compile(r'\d+\.\d+')
+HTML_USAGE_VALUE = re.compile(r'\d+\.?\d*')
+HTML_BILL_DATA = re.compile(r'var\s+billData\s*=\s*(\{[^}]+\})')
+
+
+class _StopParsing(Exception):
+    """Raised inside the HTML parser once all bill fields are found."""
+
+
+class _BillHTMLParser(HTMLParser):
+    """Single-pass scanner for bill values in an HTML page.
+
+    A ``div``/``span``/``p`` whose only content is a label such as ``水费``
+    marks the next such element as the value to read.  ``<script>`` bodies are
+    searched for ``var billData``.  No tree is built; only the text of open
+    label and value elements is buffered, and parsing stops as soon as both
+    the amount and the usage have been read.
+    """
+
+    def __init__(self):
+        """Initialize the scanner."""
+        super().__init__(convert_charrefs=True)
+        self.total_amount = None
+        self.usage = None
+        self.bill_data = None
+        # 打开的文本元素：[标签名, 直接文本片段, 是否有子元素]
+        self._elements = []
+        # 等待读取数值的字段
+        self._pending = []
+        # 正在读取数值的元素：(栈深度, 字段列表, 文本片段)
+        self._capture = None
+        self._script = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'script':
+            self._script = []
+            return
+        if tag not in HTML_TEXT_TAGS:
+            return
+        if self._elements:
+            self._elements[-1][2] = True
+        self._elements.append([tag, [], False])
+        if self._pending and self._capture is None:
+            self._capture = (len(self._elements), self._pending, [])
+            self._pending = []
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script.append(data)
+            return
+        if self._elements:
+            self._elements[-1][1].append(data)
+        if self._capture is not None:
+            self._capture[2].append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'script':
+            if self._script is not None and self.bill_data is None:
+                match = HTML_BILL_DATA.search(''.join(self._script))
+                if match:
+                    try:
+                        self.bill_data = json.loads(match.group(1))
+                    except json.JSONDecodeError:
+                        pass
+            self._script = None
+            return
+        if tag not in HTML_TEXT_TAGS:
+            return
+        # 关闭到最近的同名元素，容忍不规范的嵌套
+        for index in range(len(self._elements) - 1, -1, -1):
+            if self._elements[index][0] == tag:
+                break
+        else:
+            return
+        while len(self._elements) > index:
+            self._close_element()
+
+    def _close_element(self):
+        """元素结束：读取数值或识别标签。"""
+        depth = len(self._elements)
+        _, parts, has_child = self._elements.pop()
+
+        if self._capture is not None and self._capture[0] == depth:
+            _, fields, text_parts = self._capture
+            self._capture = None
+            self._read_value(fields, ''.join(text_parts))
+            if self.total_amount and self.usage:
+                raise _StopParsing
+
+        if has_child or not parts:
+            return
+        text = ''.join(parts)
+        if (self.total_amount is None and 'amount' not in self._pending
+                and HTML_AMOUNT_LABEL.search(text)):
+            self._pending.append('amount')
+        if (self.usage is None and 'usage' not in self._pending
+                and HTML_USAGE_LABEL.search(text)):
+            self._pending.append('usage')
+
+    def _read_value(self, fields, text):
+        """从标签后面的元素中读取数值。"""
+        if 'amount' in fields and self.total_amount is None and ('¥' in text or '.' in text):
+            match = HTML_AMOUNT_VALUE.search(text)
+            if match:
+                self.total_amount = match.group()
+        if 'usage' in fields and self.usage is None and ('吨' in text or 'm³' in text):
+            match = HTML_USAGE_VALUE.search(text)
+            if match:
+                self.usage = match.group()
+
+
+def parse_html_for_bill_data(html_content):
+    """从HTML内容中解析水费数据，解析失败时返回None。"""
+    _LOGGER.debug("尝试从HTML解析水费数据")
+
+    scanner = _BillHTMLParser()
+    try:
+        scanner.feed(html_content)
+        scanner.close()
+    except _StopParsing:
+        pass
+    except Exception as e:
+        _LOGGER.error("解析HTML失败: %s", e)
+        return None
+
+    bill_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    try:
+        # 页面文本中的数值优先于内嵌的billData
+        if scanner.total_amount and scanner.usage:
+            _LOGGER.info(
+                "成功从HTML解析数据: 水费总额=%s, 用水量=%s", scanner.total_amount, scanner.usage
+            )
+            return {
+                "total_amount": float(scanner.total_amount),
+                "usage": float(scanner.usage),
+                "bill_date": bill_date
+            }
+        if isinstance(scanner.bill_data, dict):
+            # 缺少金额或用水量的billData不是有效账单
+            bill = BILL_EXTRACTOR.first_complete(scanner.bill_data)
+            if bill is not None:
+                return {
+                    "total_amount": bill["total_amount"],
+                    "usage": bill["usage"],
+                    "bill_date": bill["bill_date"] or bill_date
+                }
+    except (TypeError, ValueError) as e:
+        _LOGGER.error("解析HTML失败: %s", e)
+        return None
+
+    _LOGGER.warning("无法从HTML解析有效数据")
+    return None
@@ -0,0 +1,159 @@
+"""Adaptive endpoint routing for the gzwater fetch strategies."""
+
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3  # 连续失败多少次后熔断
+DEFAULT_RESET_TIMEOUT = 6 * 3600  # 熔断多久后允许探测（秒）
+LATENCY_SMOOTHING = 0.3  # 延迟指数移动平均系数
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker with half-open recovery probes."""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        """Initialize the breaker in the closed state."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def allow_request(self, now):
+        """是否允许请求；熔断超时后只放行一个探测请求。"""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = STATE_HALF_OPEN
+            self._probing = False
+        if self.state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """探测请求被取消，允许下一次探测。"""
+        self._probing = False
+
+    def record_success(self):
+        """请求成功，关闭熔断器。"""
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self, now):
+        """请求失败；探测失败或连续失败达到阈值时熔断。"""
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = STATE_OPEN
+            self.opened_at = now
+
+
+class EndpointStats:
+    """Success counters and smoothed latency for one endpoint."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.attempts = 0
+        self.successes = 0
+        self.latency = None
+
+    @property
+    def success_rate(self):
+        """Return the smoothed success rate; unknown endpoints score 0.5."""
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def record(self, success, latency):
+        """记录一次请求结果。"""
+        self.attempts += 1
+        if success:
+            self.successes += 1
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+
+
+class EndpointRouter:
+    """Order fetch strategies by past performance.
+
+    The caller's preferred strategy (the one that last returned data for
+    that account) is tried first and the rest follow by success rate and
+    latency.  Callers check ``allow`` right before each attempt, so
+    strategies whose circuit is open are skipped until their half-open probe
+    is due.  One router is shared by all account clients since endpoint
+    health is a property of the service; callers should only report
+    failures of the endpoint itself, not ones specific to an account.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        """Initialize the router."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._breakers = {}
+        self._stats = {}
+
+    def _breaker(self, name):
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(self._failure_threshold, self._reset_timeout)
+        return self._breakers[name]
+
+    def _endpoint_stats(self, name):
+        if name not in self._stats:
+            self._stats[name] = EndpointStats()
+        return self._stats[name]
+
+    def order(self, names, preferred=None):
+        """返回本次应尝试的策略顺序，preferred 排在最前。"""
+
+        def sort_key(item):
+            index, name = item
+            stats = self._endpoint_stats(name)
+            latency = stats.latency if stats.latency is not None else 0.0
+            return (name != preferred, -stats.success_rate, latency, index)
+
+        return [name for _, name in sorted(enumerate(names), key=sort_key)]
+
+    def allow(self, name, now=None):
+        """在真正发出请求前调用，熔断中的策略返回False。"""
+        now = time.monotonic() if now is None else now
+        return self._breaker(name).allow_request(now)
+
+    def abandon(self, name):
+        """请求被取消且没有结果时调用，释放半开状态的探测名额。"""
+        self._breaker(name).release_probe()
+
+    def record_success(self, name, latency):
+        """记录策略成功。"""
+        self._endpoint_stats(name).record(True, latency)
+        self._breaker(name).record_success()
+
+    def record_failure(self, name, latency, now=None):
+        """记录策略失败。"""
+        now = time.monotonic() if now is None else now
+        self._endpoint_stats(name).record(False, latency)
+        breaker = self._breaker(name)
+        breaker.record_failure(now)
+        if breaker.state == STATE_OPEN:
+            _LOGGER.info("端点 %s 连续失败，暂停使用", name)
+
+    def as_dict(self):
+        """Return a snapshot of the endpoint statistics."""
+        return {
+            name: {
+                "attempts": stats.attempts,
+                "successes": stats.successes,
+                "latency": stats.latency,
+                "circuit": self._breaker(name).state,
+            }
+            for name, stats in self._stats.items()
+        }
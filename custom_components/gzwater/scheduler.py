@@ -0,0 +1,126 @@
+"""Billing-cycle-aware refresh scheduling for the gzwater integration."""
+
+import logging
+import random
+import statistics
+from datetime import date, timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import SCAN_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+CADENCE_SAMPLES = 12  # 用最近多少个出账日期推算周期
+MIN_CYCLE_DAYS = 20  # 短于此的间隔视为补发账单，不参与推算
+WINDOW_BEFORE = timedelta(days=3)  # 预计出账日前多久开始密集轮询
+WINDOW_AFTER = timedelta(days=7)  # 预计出账日后多久仍未出账则恢复每日轮询
+DENSE_INTERVAL = timedelta(hours=4)  # 出账窗口内的轮询间隔
+IDLE_INTERVAL = timedelta(seconds=SCAN_INTERVAL)  # 无法推算周期或窗口已过时的间隔
+MAX_SLEEP = timedelta(days=7)  # 距离出账窗口再远也至少每周检查一次
+BACKOFF_BASE = timedelta(minutes=15)  # 首次失败后的重试间隔，此后每次翻倍
+BACKOFF_MAX = timedelta(seconds=SCAN_INTERVAL)
+JITTER = 0.1  # 每个间隔上下浮动的比例，避免多个账号同时请求
+MIN_INTERVAL = timedelta(minutes=1)
+DUE_GRACE = timedelta(seconds=30)  # 提前这么多到期的账号并入本次刷新
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def expected_issue_date(bill_dates):
+    """Return the expected date of the next bill, or None.
+
+    ``bill_dates`` are ISO dates in any order.  The cycle length is the
+    median gap between consecutive bills, which absorbs the odd late bill
+    and works for both monthly and bimonthly meter reading.
+    """
+    dates = sorted({d for d in map(_parse_date, bill_dates) if d is not None})
+    gaps = [
+        (later - earlier).days
+        for earlier, later in zip(dates, dates[1:])
+        if (later - earlier).days >= MIN_CYCLE_DAYS
+    ]
+    if not gaps:
+        return None
+    return dates[-1] + timedelta(days=statistics.median(gaps))
+
+
+class RefreshScheduler:
+    """Decide when each account is next due for a refresh.
+
+    After a successful refresh an account sleeps until shortly before its
+    expected issue date, is polled every ``DENSE_INTERVAL`` inside the issue
+    window and falls back to daily polling once the window has passed or
+    when the cadence is unknown.  Failed refreshes are retried with
+    exponential backoff.  Every interval is jittered so accounts drift
+    apart instead of hitting the server together.  Accounts that have not
+    been refreshed yet are always due.
+    """
+
+    def __init__(self):
+        """Initialize an empty schedule."""
+        self._expected = {}
+        self._due = {}
+        self._failures = {}
+
+    def learned(self, user_id):
+        """是否已根据历史账单推算过该账号的周期。"""
+        return user_id in self._expected
+
+    def learn(self, user_id, bill_dates):
+        """根据出账日期推算下一次出账日。"""
+        expected = expected_issue_date(bill_dates)
+        self._expected[user_id] = expected
+        _LOGGER.debug("账号 %s 预计下次出账日期: %s", user_id, expected)
+
+    def is_due(self, user_id, now):
+        """账号是否需要在本次刷新中获取。"""
+        due = self._due.get(user_id)
+        return due is None or due <= now + DUE_GRACE
+
+    def mark_due(self):
+        """让所有账号在下一次刷新中获取，用于用户手动刷新。"""
+        self._due.clear()
+
+    def record_success(self, user_id, now):
+        """刷新成功，按账单周期安排下一次刷新。"""
+        self._failures.pop(user_id, None)
+        self._due[user_id] = now + self._jitter(self._interval_after_success(user_id, now))
+
+    def record_failure(self, user_id, now):
+        """刷新失败，按指数退避安排重试。"""
+        failures = self._failures.get(user_id, 0)
+        delay = BACKOFF_BASE * 2 ** failures
+        if delay < BACKOFF_MAX:
+            self._failures[user_id] = failures + 1
+        else:
+            # 达到上限后不再增加次数，避免指数溢出
+            delay = BACKOFF_MAX
+        self._due[user_id] = now + self._jitter(delay)
+
+    def next_update_interval(self, now):
+        """返回距离最早到期账号的时间，作为协调器的刷新间隔。"""
+        if not self._due:
+            return IDLE_INTERVAL
+        return max(min(self._due.values()) - now, MIN_INTERVAL)
+
+    def _interval_after_success(self, user_id, now):
+        expected = self._expected.get(user_id)
+        if expected is None:
+            return IDLE_INTERVAL
+        window_start = dt_util.start_of_local_day(expected - WINDOW_BEFORE)
+        window_end = dt_util.start_of_local_day(expected + WINDOW_AFTER)
+        if now < window_start:
+            return min(window_start - now, MAX_SLEEP)
+        if now < window_end:
+            return DENSE_INTERVAL
+        return IDLE_INTERVAL
+
+    @staticmethod
+    def _jitter(interval):
+        return interval * random.uniform(1 - JITTER, 1 + JITTER)
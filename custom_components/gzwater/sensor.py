@@ -1,79 +1,288 @@
 """Sensor platform for gzwater integration."""
 
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
 from homeassistant.const import CONF_NAME
-from homeassistant.helpers.entity import Entity
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-# 设置正确的Python路径，确保能够导入const模块
-import sys
-import os
+from .const import (
+    DOMAIN,
+    CONF_USER_ID,
+    SENSOR_TYPES,
+    ANALYTICS_SENSOR_TYPES,
+    DIAGNOSTIC_SENSOR_TYPES,
+    SIGNAL_METRICS_UPDATED,
+)
 
-# 获取当前文件所在目录的父目录（即gzwater目录）
-gzwater_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENSOR_DESCRIPTIONS = tuple(
+    SensorEntityDescription(
+        key=sensor_type,
+        name=info["name"],
+        native_unit_of_measurement=info["unit"] or None,
+        icon=info["icon"],
+    )
+    for sensor_type, info in SENSOR_TYPES.items()
+)
 
-# 将gzwater目录添加到Python路径，这样就能直接导入custom_components模块
-sys.path.append(gzwater_dir)
+ANALYTICS_DESCRIPTIONS = tuple(
+    SensorEntityDescription(
+        key=key,
+        name=info["name"],
+        native_unit_of_measurement=info["unit"],
+        icon=info["icon"],
+    )
+    for key, info in ANALYTICS_SENSOR_TYPES.items()
+)
 
-# 导入常量
-from custom_components.const import DOMAIN, SENSOR_TYPES
+DIAGNOSTIC_DESCRIPTIONS = tuple(
+    SensorEntityDescription(
+        key=metric,
+        name=info["name"],
+        native_unit_of_measurement=info["unit"],
+        icon=info["icon"],
+        entity_category=EntityCategory.DIAGNOSTIC,
+    )
+    for metric, info in DIAGNOSTIC_SENSOR_TYPES.items()
+)
 
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the gzwater sensor platform."""
     if discovery_info is None:
         return
-    
+
     coordinator = hass.data[DOMAIN]["coordinator"]
-    
+    router = hass.data[DOMAIN]["router"]
+
     sensors = []
-    for sensor_type in SENSOR_TYPES:
-        sensors.append(GzWaterSensor(coordinator, sensor_type))
-    
-    async_add_entities(sensors, True)
-
-class GzWaterSensor(CoordinatorEntity, Entity):
-    """Representation of a gzwater sensor."""
-    
-    def __init__(self, coordinator, sensor_type):
-        """Initialize the sensor."""
-        super().__init__(coordinator)
-        self.sensor_type = sensor_type
-        self._name = f"广州自来水 {SENSOR_TYPES[sensor_type]['name']}"
-        self._unit_of_measurement = SENSOR_TYPES[sensor_type]["unit"]
-        self._icon = SENSOR_TYPES[sensor_type]["icon"]
-        self._state = None
-    
-    @property
-    def name(self):
-        """Return the name of the sensor."""
-        return self._name
-    
-    @property
-    def state(self):
-        """Return the state of the sensor."""
-        if self.coordinator.data:
-            return self.coordinator.data.get(self.sensor_type)
-        return None
-    
-    @property
-    def unit_of_measurement(self):
-        """Return the unit of measurement."""
-        return self._unit_of_measurement
-    
-    @property
-    def icon(self):
-        """Return the icon of the sensor."""
-        return self._icon
-    
-    @property
-    def unique_id(self):
-        """Return a unique ID."""
-        return f"{DOMAIN}_{self.sensor_type}"
-    
-    @property
-    def device_info(self):
-        """Return device information."""
+    for account in hass.data[DOMAIN]["accounts"]:
+        for description in SENSOR_DESCRIPTIONS:
+            sensors.append(
+                GzWaterSensor(coordinator, account[CONF_USER_ID], account[CONF_NAME], description)
+            )
+        if coordinator.history is not None:
+            for description in ANALYTICS_DESCRIPTIONS:
+                sensors.append(
+                    GzWaterAnalyticsSensor(
+                        coordinator, account[CONF_USER_ID], account[CONF_NAME], description
+                    )
+                )
+        metrics = coordinator.clients[account[CONF_USER_ID]].metrics
+        if metrics.enabled:
+            for description in DIAGNOSTIC_DESCRIPTIONS:
+                sensors.append(
+                    GzWaterDiagnosticSensor(
+                        metrics, account[CONF_USER_ID], account[CONF_NAME], description, router
+                    )
+                )
+
+    # 绑定了多个表号的账号为每个表号单独创建传感器，新出现的表号在刷新后补充
+    added_meters = set()
+
+    def _new_meter_sensors():
+        meter_sensors = []
+        for account in hass.data[DOMAIN]["accounts"]:
+            user_id = account[CONF_USER_ID]
+            meters = ((coordinator.data or {}).get(user_id) or {}).get("meters") or {}
+            if len(meters) < 2:
+                continue
+            for meter_id in meters:
+                if (user_id, meter_id) in added_meters:
+                    continue
+                added_meters.add((user_id, meter_id))
+                for description in SENSOR_DESCRIPTIONS:
+                    meter_sensors.append(
+                        GzWaterMeterSensor(
+                            coordinator, user_id, account[CONF_NAME], description, meter_id
+                        )
+                    )
+        return meter_sensors
+
+    @callback
+    def _async_add_meter_sensors():
+        meter_sensors = _new_meter_sensors()
+        if meter_sensors:
+            async_add_entities(meter_sensors)
+
+    sensors.extend(_new_meter_sensors())
+    coordinator.async_add_listener(_async_add_meter_sensors)
+
+    # 不在添加前刷新：启动时使用恢复的数据，首次刷新由集成安排
+    async_add_entities(sensors)
+
+def _device_info(user_id, account_name):
+    if account_name is None:
         return {
             "identifiers": {(DOMAIN, "gzwater_device")},
             "name": "广州市自来水",
             "manufacturer": "广州市自来水公司",
         }
+    return {
+        "identifiers": {(DOMAIN, user_id)},
+        "name": f"广州市自来水 {account_name}",
+        "manufacturer": "广州市自来水公司",
+    }
+
+def _entity_name(account_name, description, meter_id=None):
+    name = description.name if meter_id is None else f"表号{meter_id} {description.name}"
+    if account_name is None:
+        return f"广州自来水 {name}"
+    return f"广州自来水 {account_name} {name}"
+
+class GzWaterSensor(CoordinatorEntity, SensorEntity):
+    """Representation of a gzwater sensor.
+
+    Name, unit, icon, unique ID and device info are fixed at creation.  The
+    value, availability and attributes are recomputed when the coordinator
+    reports an update, and the state is only written when one of them
+    changed, so unchanged accounts cost no state or recorder writes.
+    """
+
+    _attr_extra_state_attributes = None
+
+    def __init__(self, coordinator, user_id, account_name, description):
+        """Initialize the sensor.
+
+        ``account_name`` is None for the legacy single-account configuration,
+        which keeps the original entity names and unique IDs.
+        """
+        super().__init__(coordinator)
+        self.entity_description = description
+        self.user_id = user_id
+        self.account_name = account_name
+        self.sensor_type = description.key
+        self._attr_name = _entity_name(account_name, description)
+        if account_name is None:
+            self._attr_unique_id = f"{DOMAIN}_{description.key}"
+        else:
+            self._attr_unique_id = f"{DOMAIN}_{user_id}_{description.key}"
+        self._attr_device_info = _device_info(user_id, account_name)
+        self._update_from_coordinator()
+
+    @property
+    def available(self):
+        """Return False once the last good data is older than allowed."""
+        return self._attr_available
+
+    def _update_from_coordinator(self):
+        """从协调器读取当前值，有变化时返回True。"""
+        coordinator = self.coordinator
+        account_data = (coordinator.data or {}).get(self.user_id)
+        value = self._current_value(account_data)
+
+        attributes = {}
+        if self.user_id in coordinator.stale:
+            attributes["stale"] = True
+            fetched_at = coordinator.fetched_at.get(self.user_id)
+            if fetched_at is not None:
+                attributes["last_success"] = fetched_at.isoformat()
+        attributes = attributes or None
+
+        available = self._current_available(account_data)
+        if (
+            value == self._attr_native_value
+            and available == self._attr_available
+            and attributes == self._attr_extra_state_attributes
+        ):
+            return False
+        self._attr_native_value = value
+        self._attr_available = available
+        self._attr_extra_state_attributes = attributes
+        return True
+
+    def _current_value(self, account_data):
+        return account_data.get(self.sensor_type) if account_data else None
+
+    def _current_available(self, account_data):
+        return self.coordinator.is_available(self.user_id)
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write the state only when something changed."""
+        if self._update_from_coordinator():
+            self.async_write_ha_state()
+
+class GzWaterMeterSensor(GzWaterSensor):
+    """Bill of one meter bound to an account with several meters.
+
+    The meter is keyed by the ``id`` field of the bind page record; the
+    sensor is unavailable while that meter is missing from the latest data.
+    """
+
+    def __init__(self, coordinator, user_id, account_name, description, meter_id):
+        """Initialize the sensor."""
+        self.meter_id = meter_id
+        super().__init__(coordinator, user_id, account_name, description)
+        self._attr_name = _entity_name(account_name, description, meter_id)
+        self._attr_unique_id = f"{DOMAIN}_{user_id}_{meter_id}_{description.key}"
+
+    def _meter_data(self, account_data):
+        return ((account_data or {}).get("meters") or {}).get(self.meter_id)
+
+    def _current_value(self, account_data):
+        meter_data = self._meter_data(account_data)
+        return meter_data.get(self.sensor_type) if meter_data else None
+
+    def _current_available(self, account_data):
+        return super()._current_available(account_data) and self._meter_data(account_data) is not None
+
+class GzWaterAnalyticsSensor(GzWaterSensor):
+    """Aggregate computed from an account's bill history."""
+
+    def _current_value(self, account_data):
+        analytics = self.coordinator.analytics.get(self.user_id)
+        return analytics.values.get(self.sensor_type) if analytics else None
+
+class GzWaterDiagnosticSensor(SensorEntity):
+    """Timing or counter from the latest refresh of one account.
+
+    The duration sensor carries the per-stage breakdown and the strategy
+    sensor a snapshot of the shared endpoint router.
+    """
+
+    _attr_should_poll = False
+    _attr_extra_state_attributes = None
+
+    def __init__(self, metrics, user_id, account_name, description, router=None):
+        """Initialize the sensor."""
+        self.entity_description = description
+        self.metrics = metrics
+        self.router = router
+        self.user_id = user_id
+        self.account_name = account_name
+        self.metric = description.key
+        self._attr_name = _entity_name(account_name, description)
+        self._attr_unique_id = f"{DOMAIN}_{user_id}_diagnostic_{description.key}"
+        self._attr_device_info = _device_info(user_id, account_name)
+
+    async def async_added_to_hass(self):
+        """Subscribe to metric updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, SIGNAL_METRICS_UPDATED, self._handle_metrics_update
+            )
+        )
+
+    @callback
+    def _handle_metrics_update(self):
+        """读取最新的指标，有变化时写入状态；耗时以毫秒显示。"""
+        metrics = self.metrics
+        if metrics.refreshes == 0:
+            return
+        attributes = None
+        if self.metric == "duration":
+            value = round(metrics.duration * 1000, 1)
+            attributes = {
+                f"{stage}_ms": round(seconds * 1000, 1)
+                for stage, seconds in metrics.stages.items()
+            }
+        else:
+            value = getattr(metrics, self.metric)
+            if self.metric == "strategy" and self.router is not None:
+                attributes = {"endpoints": self.router.as_dict()}
+        if value == self._attr_native_value and attributes == self._attr_extra_state_attributes:
+            return
+        self._attr_native_value = value
+        self._attr_extra_state_attributes = attributes
+        self.async_write_ha_state()
@@ -0,0 +1,39 @@
+"""Persistent login session storage for the gzwater integration."""
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.sessions"
+SAVE_DELAY = 10
+
+
+class GzWaterSessionStore:
+    """Keep each account's cookies and login token in ``.storage``.
+
+    The stored state is the dict produced by ``GzWaterApiClient.session_state``
+    and survives restarts, so a refresh can reuse a valid session instead of
+    logging in again.
+    """
+
+    def __init__(self, hass):
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._sessions = {}
+
+    async def async_load(self):
+        """从磁盘加载已保存的会话。"""
+        data = await self._store.async_load()
+        self._sessions = data or {}
+
+    def get(self, user_id):
+        """返回账号已保存的会话，没有时返回None。"""
+        return self._sessions.get(user_id)
+
+    @callback
+    def async_update_session(self, user_id, state):
+        """记录账号的新会话并延迟写盘。"""
+        self._sessions[user_id] = state
+        self._store.async_delay_save(lambda: self._sessions, SAVE_DELAY)
@@ -0,0 +1,68 @@
+"""Long-term statistics import for the gzwater integration."""
+
+import datetime
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+
+STATISTIC_USAGE = "usage"
+STATISTIC_COST = "cost"
+
+
+def statistic_id(user_id, kind):
+    """返回账号某类统计的外部统计ID。"""
+    return f"{DOMAIN}:{slugify(user_id)}_{kind}"
+
+
+def _period_start(period):
+    """账期 YYYY-MM 对应的本地月初时间。"""
+    year, month = (int(part) for part in period.split("-"))
+    return datetime.datetime(year, month, 1, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+
+
+@callback
+def async_import_bill_statistics(hass, user_id, account_name, rows):
+    """将账单行批量写入长期统计。
+
+    rows 来自 BillHistoryStore.add_bills：(账期, 金额, 用水量, 累计用水量, 累计金额)。
+    同一时间点的统计会被覆盖，因此重写已有账期是安全的。
+    """
+    if not rows:
+        return
+    label = account_name or user_id
+    usage_stats = []
+    cost_stats = []
+    for period, total_amount, usage, usage_sum, amount_sum in rows:
+        start = _period_start(period)
+        usage_stats.append(StatisticData(start=start, state=usage, sum=usage_sum))
+        cost_stats.append(StatisticData(start=start, state=total_amount, sum=amount_sum))
+
+    async_add_external_statistics(
+        hass,
+        StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"广州自来水 {label} 用水量",
+            source=DOMAIN,
+            statistic_id=statistic_id(user_id, STATISTIC_USAGE),
+            unit_of_measurement="m³",
+        ),
+        usage_stats,
+    )
+    async_add_external_statistics(
+        hass,
+        StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"广州自来水 {label} 水费",
+            source=DOMAIN,
+            statistic_id=statistic_id(user_id, STATISTIC_COST),
+            unit_of_measurement="CNY",
+        ),
+        cost_stats,
+    )
@@ -0,0 +1,92 @@
+"""Test helpers for the gzwater integration.
+
+The integration's ``__init__`` imports Home Assistant, which the parser
+tests do not need, so the component directory is registered as a bare
+package and its standalone modules are imported from there.  Modules that
+only need ``homeassistant.util.dt`` get a UTC stand-in when Home Assistant
+is not installed.
+"""
+
+import datetime
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+COMPONENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "custom_components",
+    "gzwater",
+)
+PACKAGE = "gzwater_tests"
+
+
+def _install_dt_util():
+    """Register a minimal ``homeassistant.util.dt`` that treats local time as UTC."""
+    try:
+        importlib.import_module("homeassistant.util.dt")
+        return
+    except ImportError:
+        pass
+    dt_util = types.ModuleType("homeassistant.util.dt")
+    dt_util.UTC = datetime.timezone.utc
+    dt_util.utcnow = lambda: datetime.datetime.now(datetime.timezone.utc)
+    dt_util.start_of_local_day = lambda day: datetime.datetime.combine(
+        day, datetime.time(), datetime.timezone.utc
+    )
+    util = types.ModuleType("homeassistant.util")
+    util.dt = dt_util
+    homeassistant = types.ModuleType("homeassistant")
+    homeassistant.__path__ = []
+    homeassistant.util = util
+    sys.modules.setdefault("homeassistant", homeassistant)
+    sys.modules.setdefault("homeassistant.util", util)
+    sys.modules.setdefault("homeassistant.util.dt", dt_util)
+
+
+def load_module(name):
+    """Import ``custom_components/gzwater/<name>.py`` without the package __init__."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [COMPONENT_DIR]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+@pytest.fixture(scope="session")
+def parser():
+    """Return the parser module."""
+    return load_module("parser")
+
+
+@pytest.fixture(scope="session")
+def api():
+    """Return the API client module."""
+    return load_module("api")
+
+
+@pytest.fixture(scope="session")
+def router():
+    """Return the endpoint router module."""
+    return load_module("router")
+
+
+@pytest.fixture(scope="session")
+def scheduler():
+    """Return the refresh scheduler module."""
+    _install_dt_util()
+    return load_module("scheduler")
+
+
+@pytest.fixture(scope="session")
+def analytics():
+    """Return the bill analytics module."""
+    return load_module("analytics")
+
+
+@pytest.fixture(scope="session")
+def history():
+    """Return the bill history store module."""
+    return load_module("history")
@@ -0,0 +1,50 @@
+"""Tests for the incremental bill analytics."""
+
+
+def _period(index):
+    return f"{2020 + index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def test_rolling_averages_survive_lookback_eviction(analytics):
+    bill_analytics = analytics.BillAnalytics()
+    usages = [float(index * 3 % 17) for index in range(analytics.LOOKBACK * 2 + 5)]
+    for index, usage in enumerate(usages):
+        assert bill_analytics.add(_period(index), usage * 4, usage)
+        for window in analytics.ROLLING_WINDOWS:
+            expected = (
+                round(sum(usages[index + 1 - window:index + 1]) / window, 2)
+                if index + 1 >= window
+                else None
+            )
+            assert bill_analytics.values[f"usage_avg_{window}"] == expected
+
+
+def test_year_over_year(analytics):
+    bill_analytics = analytics.BillAnalytics()
+    bill_analytics.add("2023-05", 40.0, 10.0)
+    bill_analytics.add("2024-04", 40.0, 10.0)
+    # 去年同期缺失
+    assert bill_analytics.values["usage_yoy"] is None
+    bill_analytics.add("2024-05", 48.0, 12.0)
+    assert bill_analytics.values["usage_yoy"] == 20.0
+    assert bill_analytics.values["usage_delta"] == 2.0
+    assert bill_analytics.values["amount_delta"] == 8.0
+
+
+def test_price_needs_usage(analytics):
+    bill_analytics = analytics.BillAnalytics()
+    bill_analytics.add("2024-05", 12.0, 0)
+    assert bill_analytics.values["price"] is None
+    bill_analytics.add("2024-06", 12.0, None)
+    assert bill_analytics.values["price"] is None
+    bill_analytics.add("2024-07", 12.0, 4.0)
+    assert bill_analytics.values["price"] == 3.0
+
+
+def test_extend_rejects_out_of_order_periods(analytics):
+    bill_analytics = analytics.BillAnalytics()
+    assert bill_analytics.extend([("2024-04", 10.0, 2.0), ("2024-05", 12.0, 3.0)])
+    values = bill_analytics.values
+    assert not bill_analytics.extend([("2024-03", 8.0, 1.0)])
+    assert not bill_analytics.extend([("2024-05", 8.0, 1.0)])
+    assert bill_analytics.values is values
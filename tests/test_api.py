@@ -0,0 +1,158 @@
+"""Tests for the gzwater API client helpers."""
+
+import asyncio
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"code": 401, "msg": "未登录"},
+        {"code": 0, "data": {}},
+        {"total_amount": 12.5},
+    ],
+)
+def test_bill_response_rejects_incomplete_bills(api, body):
+    assert api._parse_bill_response(json.dumps(body)) is None
+
+
+def test_bill_response_reads_bill(api):
+    result = api._parse_bill_response(
+        json.dumps({"total_amount": "88.6", "usage": 21.5, "billDate": "2024-06-15"})
+    )
+    assert result["total_amount"] == 88.6
+    assert result["usage"] == 21.5
+    assert result["bill_date"] == "2024-06-15"
+
+
+def _client(api, cookies, token=None):
+    return api.GzWaterApiClient(
+        None, "1008836201", "secret", session_state={"cookies": cookies, "token": token}
+    )
+
+
+def test_short_lived_waf_cookie_does_not_force_login(api):
+    now = 1_000_000
+    client = _client(api, {"sid": ["abc", None], "acw_tc": ["waf", now + 60]})
+    assert not client.session_needs_login(now)
+    # 过期的非登录Cookie被丢弃，仍不需要登录
+    assert not client.session_needs_login(now + 3600)
+    assert "acw_tc" not in client.session_state["cookies"]
+
+
+def test_expiring_auth_session_forces_login(api):
+    now = 1_000_000
+    client = _client(api, {"sid": ["abc", now + 60]})
+    assert client.session_needs_login(now)
+    client = _client(api, {"acw_tc": ["waf", now + 3600]})
+    assert client.session_needs_login(now)
+    client = _client(api, {}, token={"value": "t", "expires": now + 60})
+    assert client.session_needs_login(now)
+    client = _client(api, {}, token={"value": "t", "expires": now + 7200})
+    assert not client.session_needs_login(now)
+
+
+def test_bind_page_keeps_every_complete_meter(api):
+    client = _client(api, {})
+    pages = {
+        1: [
+            {"id": "A", "total_amount": None, "usage": 3.0, "period": "202406", "bill_date": None},
+            {"id": "B", "total_amount": 88.6, "usage": 23.0, "period": "202406",
+             "bill_date": "2024/6/15"},
+        ],
+        2: [
+            {"id": "C", "total_amount": 31.4, "usage": 8.0, "period": "2024-06",
+             "bill_date": "20240615"},
+        ],
+    }
+
+    async def fetch_page(page_number):
+        return pages[page_number], page_number < len(pages), False
+
+    client._async_fetch_bind_page = fetch_page
+    result = asyncio.run(client.async_fetch_bind_page())
+    assert result["total_amount"] == 88.6
+    assert result["period"] == "2024-06"
+    assert set(result["meters"]) == {"B", "C"}
+    assert result["meters"]["C"] == {
+        "total_amount": 31.4, "usage": 8.0, "bill_date": "2024-06-15", "period": "2024-06"
+    }
+
+
+def _counting_fetch(results, gate=None):
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        if gate is not None:
+            await gate.wait()
+        result = results[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return fetch, calls
+
+
+def test_single_flight_joins_concurrent_callers(api):
+    async def run():
+        gate = asyncio.Event()
+        fetch, calls = _counting_fetch([{"usage": 1.0}], gate)
+        flight = api.SingleFlight(0)
+        waiters = [asyncio.ensure_future(flight.async_do("u", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*waiters)
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+    asyncio.run(run())
+
+
+def test_single_flight_reuses_fresh_result(api):
+    async def run():
+        fetch, calls = _counting_fetch([{"usage": 1.0}, {"usage": 2.0}])
+        flight = api.SingleFlight(60)
+        first = await flight.async_do("u", fetch)
+        assert await flight.async_do("u", fetch) is first
+        assert len(calls) == 1
+        # 窗口为0时每次都重新获取
+        flight = api.SingleFlight(0)
+        fetch, calls = _counting_fetch([{"usage": 1.0}, {"usage": 2.0}])
+        await flight.async_do("u", fetch)
+        assert await flight.async_do("u", fetch) == {"usage": 2.0}
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_single_flight_does_not_cache_failures(api):
+    async def run():
+        fetch, calls = _counting_fetch([api.GzWaterApiError("boom"), {"usage": 1.0}])
+        flight = api.SingleFlight(60)
+        with pytest.raises(api.GzWaterApiError):
+            await flight.async_do("u", fetch)
+        assert await flight.async_do("u", fetch) == {"usage": 1.0}
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_single_flight_cancelled_waiter_keeps_shared_fetch(api):
+    async def run():
+        gate = asyncio.Event()
+        fetch, calls = _counting_fetch([{"usage": 1.0}], gate)
+        flight = api.SingleFlight(0)
+        cancelled = asyncio.ensure_future(flight.async_do("u", fetch))
+        kept = asyncio.ensure_future(flight.async_do("u", fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        assert await kept == {"usage": 1.0}
+        assert cancelled.cancelled()
+        assert len(calls) == 1
+
+    asyncio.run(run())
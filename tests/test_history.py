@@ -0,0 +1,63 @@
+"""Tests for the SQLite bill history store."""
+
+import pytest
+
+
+def _bill(period, total_amount, usage, bill_date=None):
+    return {"period": period, "total_amount": total_amount, "usage": usage, "bill_date": bill_date}
+
+
+@pytest.fixture
+def store(history, tmp_path):
+    bill_store = history.BillHistoryStore(str(tmp_path / history.HISTORY_DB_NAME))
+    bill_store.open()
+    yield bill_store
+    bill_store.close()
+
+
+def test_add_bills_returns_cumulative_rows(store):
+    rows = store.add_bills("a", [_bill("2024-05", 40.0, 10.0), _bill("2024-06", None, 12.0)])
+    assert rows == [
+        ("2024-05", 40.0, 10.0, 10.0, 40.0),
+        ("2024-06", None, 12.0, 22.0, 40.0),
+    ]
+    assert store.high_water_mark("a") == "2024-06"
+    assert store.high_water_mark("b") is None
+
+
+def test_add_bills_ignores_existing_periods(store):
+    store.add_bills("a", [_bill("2024-05", 40.0, 10.0)])
+    assert store.add_bills("a", [_bill("2024-05", 99.0, 99.0)]) == []
+    assert store.add_bills("a", [{"period": None, "total_amount": 1.0, "usage": 1.0}]) == []
+    assert store.recent_bills("a", 10) == [("2024-05", 40.0, 10.0)]
+
+
+def test_backfilled_period_rewrites_later_sums(store):
+    store.add_bills("a", [_bill("2024-05", 40.0, 10.0), _bill("2024-07", 48.0, 12.0)])
+    store.add_bills("b", [_bill("2024-06", 1.0, 1.0)])
+    rows = store.add_bills("a", [_bill("2024-06", 20.0, 5.0), _bill("2024-07", 0.0, 0.0)])
+    assert rows == [
+        ("2024-06", 20.0, 5.0, 15.0, 60.0),
+        ("2024-07", 48.0, 12.0, 27.0, 108.0),
+    ]
+    assert store.high_water_mark("a") == "2024-07"
+
+
+def test_iter_bills_filters_across_chunks(store):
+    for account in ("a", "b", "c"):
+        store.add_bills(
+            account,
+            [
+                _bill(f"2023-{month:02d}", float(month), 1.0, f"2023-{month:02d}-15")
+                for month in range(1, 13)
+            ],
+        )
+    rows = list(
+        store.iter_bills(accounts=["c", "a"], start="2023-03", end="2023-10", chunk_size=3)
+    )
+    assert [(row[0], row[1]) for row in rows] == [
+        (account, f"2023-{month:02d}") for account in ("a", "c") for month in range(3, 11)
+    ]
+    assert rows[0] == ("a", "2023-03", 3.0, 1.0, "2023-03-15")
+    assert len(list(store.iter_bills(chunk_size=5))) == 36
+    assert list(store.iter_bills(start="2024-01")) == []
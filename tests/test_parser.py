@@ -0,0 +1,95 @@
+"""Tests for the bill response parsers."""
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    ("payload", "expected"),
+    [
+        # 账单字段在顶层
+        ({"total_amount": 12.5, "usage": 3}, (12.5, 3.0)),
+        # 账单字段在 data 中
+        ({"data": {"total_amount": "50", "usage": "10"}}, (50.0, 10.0)),
+        # 列表中的第一条记录
+        ({"data": {"list": [{"amount": 30, "water_usage": 6}]}}, (30.0, 6.0)),
+        ({"data": {"records": [{"cost": 8.8, "volume": 2}, {"cost": 1, "volume": 1}]}}, (8.8, 2.0)),
+        # 空列表时回退到 data 中的账单字段
+        ({"data": {"total_amount": 50, "usage": 10, "list": []}}, (50.0, 10.0)),
+        # 空列表时回退到顶层的账单字段
+        ({"total_amount": 12.5, "usage": 3, "data": {"records": []}}, (12.5, 3.0)),
+        # 列表中没有完整记录时回退到对象
+        ({"data": {"total_amount": 20, "usage": 4, "bills": [{"amount": 1}]}}, (20.0, 4.0)),
+        # 错误响应
+        ({"code": 401, "msg": "未登录"}, (None, None)),
+        ([], (None, None)),
+    ],
+)
+def test_extract_water_bill_info(parser, payload, expected):
+    assert parser.extract_water_bill_info(payload) == expected
+
+
+def test_records_skip_empty_list(parser):
+    payload = {"data": {"total_amount": 50, "usage": 10, "list": []}}
+    assert parser.BILL_EXTRACTOR.records(payload) == [payload["data"]]
+
+
+def test_extract_all_records(parser):
+    payload = {
+        "data": {
+            "records": [
+                {"meterNo": 1, "amount": "10.5", "usage": "3", "billMonth": "202406"},
+                {"meterNo": 2, "total_amount": 20, "consumption": 5, "billMonth": "2024/7"},
+            ],
+            "total": 2,
+        }
+    }
+    records = parser.BILL_EXTRACTOR.extract(payload)
+    assert [record["id"] for record in records] == ["1", "2"]
+    assert [record["total_amount"] for record in records] == [10.5, 20.0]
+    assert [record["usage"] for record in records] == [3.0, 5.0]
+
+
+def test_has_more_pages(parser):
+    assert parser.has_more_pages({"data": {"pages": 3}}, 1, 10, 10)
+    assert not parser.has_more_pages({"data": {"pages": 3}}, 3, 10, 10)
+    assert parser.has_more_pages({"data": {"total": 25}}, 2, 10, 10)
+    assert not parser.has_more_pages({"data": {}}, 1, 4, 10)
+    assert not parser.has_more_pages({"data": {"pages": 3}}, 1, 0, 10)
+
+
+def test_parse_html_text_values(parser):
+    html = (
+        "<html><body><div><span>水费合计</span><span>¥45.60</span></div>"
+        "<div><p>用水量</p><p>12.5吨</p></div></body></html>"
+    )
+    result = parser.parse_html_for_bill_data(html)
+    assert result["total_amount"] == 45.6
+    assert result["usage"] == 12.5
+
+
+def test_parse_html_without_bill(parser):
+    assert parser.parse_html_for_bill_data("<html><body>请在微信中打开</body></html>") is None
+
+
+def test_parse_html_bill_data(parser):
+    html = '<script>var billData = {"total_amount": "30.5", "usage": 8};</script>'
+    result = parser.parse_html_for_bill_data(html)
+    assert result["total_amount"] == 30.5
+    assert result["usage"] == 8.0
+
+
+def test_parse_html_incomplete_bill_data(parser):
+    html = '<script>var billData = {"code": 401, "msg": "未登录"};</script>'
+    assert parser.parse_html_for_bill_data(html) is None
+
+
+def test_first_complete_normalizes_period_and_date(parser):
+    payload = {"data": {"records": [{"amount": 10, "usage": 2, "billMonth": "2024/6", "billDate": "20240615"}]}}
+    bill = parser.BILL_EXTRACTOR.first_complete(payload)
+    assert bill["period"] == "2024-06"
+    assert bill["bill_date"] == "2024-06-15"
+
+
+def test_normalize_invalid_period(parser):
+    bill = parser.BILL_EXTRACTOR.normalize({"period": "unknown", "bill_date": None})
+    assert bill["period"] is None
@@ -0,0 +1,79 @@
+"""Tests for endpoint routing and circuit breaking."""
+
+import asyncio
+
+
+def test_preferred_strategy_first(router):
+    endpoint_router = router.EndpointRouter()
+    names = ["bind_page", "alternative:a", "login"]
+    assert endpoint_router.order(names) == names
+    assert endpoint_router.order(names, "login")[0] == "login"
+
+
+def test_circuit_opens_after_threshold(router):
+    endpoint_router = router.EndpointRouter(failure_threshold=2, reset_timeout=10)
+    for _ in range(2):
+        assert endpoint_router.allow("bind_page", now=0)
+        endpoint_router.record_failure("bind_page", 0.1, now=0)
+    assert not endpoint_router.allow("bind_page", now=5)
+    # 熔断超时后只放行一个探测请求
+    assert endpoint_router.allow("bind_page", now=10)
+    assert not endpoint_router.allow("bind_page", now=10)
+    endpoint_router.record_success("bind_page", 0.1)
+    assert endpoint_router.allow("bind_page", now=11)
+
+
+def _client_with_strategy(api, router, error):
+    endpoint_router = router.EndpointRouter(failure_threshold=1)
+    client = api.GzWaterApiClient(
+        None, "1008836201", "secret", router=endpoint_router,
+        session_state={"cookies": {"sid": ["abc", None]}, "token": None},
+    )
+
+    async def fail():
+        raise error
+
+    client._strategies = {"bind_page": fail}
+    return client, endpoint_router
+
+
+def test_account_errors_do_not_open_shared_circuit(api, router):
+    for error in (api.GzWaterParseError("no record"), api.GzWaterApiError("status 404")):
+        client, endpoint_router = _client_with_strategy(api, router, error)
+        assert asyncio.run(client._async_run_strategy("bind_page")) is None
+        assert endpoint_router.allow("bind_page")
+
+
+def test_endpoint_errors_open_shared_circuit(api, router):
+    client, endpoint_router = _client_with_strategy(
+        api, router, api.GzWaterEndpointError("status 502")
+    )
+    assert asyncio.run(client._async_run_strategy("bind_page")) is None
+    assert not endpoint_router.allow("bind_page")
+
+
+def test_hedge_losers_finish_before_return(api, router):
+    endpoint_router = router.EndpointRouter()
+    client = api.GzWaterApiClient(
+        None, "1008836201", "secret", router=endpoint_router, hedge_delay=0,
+        session_state={"cookies": {"sid": ["abc", None]}, "token": None},
+    )
+    abandoned = []
+    endpoint_router.abandon = abandoned.append
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return {"total_amount": 1.0, "usage": 1.0}
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    client._strategies = {"alternative:fast": fast, "alternative:slow": slow}
+    async def race():
+        result = await client._async_race_strategies(["alternative:fast", "alternative:slow"])
+        # 返回时被取消的请求已经释放了探测名额
+        return result, list(abandoned)
+
+    result, abandoned_on_return = asyncio.run(race())
+    assert result["total_amount"] == 1.0
+    assert abandoned_on_return == ["alternative:slow"]
@@ -0,0 +1,95 @@
+"""Tests for the billing-cycle-aware refresh scheduler."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(scheduler, monkeypatch):
+    monkeypatch.setattr(scheduler.random, "uniform", lambda low, high: 1.0)
+
+
+NOW = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def test_expected_issue_date_uses_median_gap(scheduler):
+    # 一次迟到的账单和一张补发账单都不影响推算
+    dates = ["2024-01-15", "2024-02-14", "2024-03-25", "2024-04-24", "2024-04-27", "2024-05-27"]
+    assert scheduler.expected_issue_date(dates) == date(2024, 6, 26)
+    # 双月抄表
+    dates = ["2024-05-15", "2024-01-15", "2024-07-15", "2024-03-15"]
+    assert scheduler.expected_issue_date(dates) == date(2024, 9, 14)
+
+
+@pytest.mark.parametrize(
+    "dates", [[], ["2024-05-15"], ["2024-05-15", "2024-05-20"], ["bad", None]]
+)
+def test_expected_issue_date_needs_a_cycle(scheduler, dates):
+    assert scheduler.expected_issue_date(dates) is None
+
+
+def test_unknown_accounts_are_due(scheduler):
+    schedule = scheduler.RefreshScheduler()
+    assert schedule.is_due("u", NOW)
+    assert schedule.next_update_interval(NOW) == scheduler.IDLE_INTERVAL
+
+
+def test_backoff_doubles_and_stays_capped(scheduler):
+    schedule = scheduler.RefreshScheduler()
+    schedule.record_failure("u", NOW)
+    assert schedule.next_update_interval(NOW) == scheduler.BACKOFF_BASE
+    schedule.record_failure("u", NOW)
+    assert schedule.next_update_interval(NOW) == scheduler.BACKOFF_BASE * 2
+    for _ in range(2000):
+        schedule.record_failure("u", NOW)
+    assert schedule.next_update_interval(NOW) == scheduler.BACKOFF_MAX
+    # 成功后重新从基础间隔开始退避
+    schedule.record_success("u", NOW)
+    schedule.record_failure("u", NOW)
+    assert schedule.next_update_interval(NOW) == scheduler.BACKOFF_BASE
+
+
+def test_mark_due_makes_every_account_due(scheduler):
+    schedule = scheduler.RefreshScheduler()
+    schedule.record_success("a", NOW)
+    schedule.record_failure("b", NOW)
+    later = NOW + timedelta(minutes=5)
+    assert not schedule.is_due("a", later)
+    assert not schedule.is_due("b", later)
+    schedule.mark_due()
+    assert schedule.is_due("a", later)
+    assert schedule.is_due("b", later)
+
+
+def _interval_after_success(scheduler, now):
+    schedule = scheduler.RefreshScheduler()
+    schedule.learn("u", ["2024-04-15", "2024-05-15", "2024-06-15"])
+    schedule.record_success("u", now)
+    return schedule.next_update_interval(now)
+
+
+def test_sleeps_until_issue_window(scheduler):
+    # 预计 2024-07-15 出账，窗口从 2024-07-12 零点开始
+    now = datetime(2024, 7, 6, 12, tzinfo=timezone.utc)
+    assert _interval_after_success(scheduler, now) == timedelta(days=5, hours=12)
+    assert _interval_after_success(scheduler, NOW) == scheduler.MAX_SLEEP
+
+
+@pytest.mark.parametrize(
+    "now, interval",
+    [
+        (datetime(2024, 7, 12, tzinfo=timezone.utc), "DENSE_INTERVAL"),
+        (datetime(2024, 7, 21, 23, tzinfo=timezone.utc), "DENSE_INTERVAL"),
+        (datetime(2024, 7, 22, tzinfo=timezone.utc), "IDLE_INTERVAL"),
+    ],
+)
+def test_window_and_idle_intervals(scheduler, now, interval):
+    assert _interval_after_success(scheduler, now) == getattr(scheduler, interval)
+
+
+def test_unlearned_cadence_polls_daily(scheduler):
+    schedule = scheduler.RefreshScheduler()
+    schedule.learn("u", ["2024-05-15"])
+    schedule.record_success("u", NOW)
+    assert schedule.next_update_interval(NOW) == scheduler.IDLE_INTERVAL